@@ -7,23 +7,24 @@
 #
 # Contact: Kyle Lahnakoski (kyle@lahnakoski.com)
 #
-import base64
 import io
 import os
 import re
 import shutil
+from contextlib import nullcontext
+from copy import deepcopy
 from datetime import datetime
-from mimetypes import MimeTypes
 from tempfile import NamedTemporaryFile, mkdtemp
 
-from mo_dots import Null, coalesce, get_module, is_list, to_data, is_sequence, is_data, is_missing, from_data
+from mo_dots import Null, coalesce, get_module, is_list, to_data, is_sequence, is_missing, from_data
 from mo_future import text, is_text, ConfigParser, StringIO
-from mo_json import json2value
 from mo_logs import Except, logger
-from mo_logs.exceptions import get_stacktrace
-from mo_math import randoms
 
-from mo_files import mimetype
+from mo_files import mimetype, lines as _lines, ranges as _ranges
+from mo_files.cache import parsed_cache, content_cache
+from mo_files.locks import FileLock
+from mo_files.profiles import IOProfile, DEFAULT as DEFAULT_PROFILE, SCAN
+from mo_files.reaper import reaper, TRASH
 from mo_files.url import URL
 
 windows_drive = re.compile(r"^/[a-zA-Z]:[/\\]")
@@ -35,7 +36,9 @@ class File:
     ASSUMES ALL FILE CONTENT IS UTF8 ENCODED STRINGS
     """
 
-    def __new__(cls, filename, key=None, buffering=2 ** 14, suffix=None):
+    profile = DEFAULT_PROFILE
+
+    def __new__(cls, filename, *args, **kwargs):
         if filename == None:
             return Null
         elif isinstance(filename, File):
@@ -43,11 +46,13 @@ class File:
         else:
             return object.__new__(cls)
 
-    def __init__(self, filename, key=None, suffix=None, mime_type=None):
+    def __init__(self, filename, key=None, suffix=None, mime_type=None, buffering=None, profile=None):
         """
         :param filename: STRING
         :param key: BASE64 AES KEY USED ON ENCRYPTED FILES
         :param mime_type: IN THE UNLIKELY CASE YOU WISH TO DICTATE THE mimetype
+        :param buffering: BYTES READ AT A TIME (SHORTCUT FOR profile=IOProfile(buffering=...))
+        :param profile: IOProfile FOR READING (EG SCAN FOR BIG ONE-PASS READS)
         """
         if isinstance(filename, File):
             return
@@ -56,6 +61,8 @@ class File:
 
         self.key = base642bytearray(key)
         self._mime_type = mime_type
+        if profile or buffering:
+            self.profile = (profile or DEFAULT_PROFILE).replace(buffering=buffering) if buffering else profile
 
         if filename in (".", "/", ""):
             self._filename = filename or "."
@@ -145,6 +152,8 @@ class File:
             elif self.abs_path.endswith(".json"):
                 self._mime_type = mimetype.JSON
             else:
+                from mimetypes import MimeTypes
+
                 mime = MimeTypes()
                 self._mime_type, _ = mime.guess_type(self.abs_path)
                 if not self._mime_type:
@@ -207,12 +216,15 @@ class File:
         suffix = datetime2string(coalesce(timestamp, datetime.utcnow()), "%Y%m%d_%H%M%S")
         return add_suffix(self._filename, suffix)
 
-    def read(self, encoding="utf8") -> str:
+    def read(self, encoding="utf8", cache=False) -> str:
         """
         :param encoding:
+        :param cache: True TO USE THE PROCESS-WIDE CACHE OF SMALL FILES (SEE content_cache.stats())
         :return:
         """
-        with open(self._filename, "rb") as f:
+        if cache and not self.key:
+            return content_cache.get(self.os_path, ("text", encoding), lambda: _read_all(self._filename).decode(encoding))
+        with self.profile.open(self._filename) as f:
             if self.key:
                 return get_module("mo_math.crypto").decrypt(f.read(), self.key)
             else:
@@ -232,22 +244,39 @@ class File:
                 return zipped.open(zip_name).read().decode(encoding)
 
     def read_lines(self, encoding="utf8"):
-        with open(self._filename, "rb") as f:
+        with self.profile.open(self._filename) as f:
             for line in f:
                 yield line.decode(encoding).rstrip()
 
-    def read_json(self, encoding="utf8", flexible=True, leaves=True):
+    def read_json(self, encoding="utf8", flexible=True, leaves=True, cache=False):
+        """
+        :param cache: True TO USE THE PROCESS-WIDE CACHE OF PARSED FILES (RETURNS A COPY)
+        """
+        if cache:
+            raw = parsed_cache.get(
+                self.os_path,
+                ("json", encoding, flexible),
+                lambda: from_data(self.read_json(encoding=encoding, flexible=flexible, leaves=leaves)),
+            )
+            return to_data(deepcopy(raw))
+        from mo_json import json2value
+
         content = self.read(encoding=encoding)
         value = json2value(content, flexible=flexible)
-        if '"$concat"' in content:
+        if any(f'"{name}"' in content for name in functions):
             return to_data(apply_functions(value))
         return value
 
     def is_directory(self):
         return os.path.isdir(self._filename)
 
-    def read_bytes(self):
+    def read_bytes(self, cache=False):
+        """
+        :param cache: True TO USE THE PROCESS-WIDE CACHE OF SMALL FILES (SEE content_cache.stats())
+        """
         try:
+            if cache and not self.key:
+                return content_cache.get(self.os_path, "bytes", lambda: _read_all(self._filename))
             if not self.parent.exists:
                 self.parent.create()
             with open(self._filename, "rb") as f:
@@ -266,15 +295,18 @@ class File:
                 f.write(get_module("mo_math.crypto").encrypt(content, self.key))
             else:
                 f.write(content)
+        self._changed()
 
-    def write(self, content):
+    def write(self, content, lock=False, timeout=None):
         """
         :param content: text, or iterable of text
+        :param lock: True TO HOLD AN EXCLUSIVE LOCK ON THE FILE WHILE WRITING
+        :param timeout: SECONDS TO WAIT FOR THE LOCK
         :return:
         """
         if not self.parent.exists:
             self.parent.create()
-        with open(self._filename, "wb") as f:
+        with self._write_lock(lock, timeout, append=False), open(self._filename, "wb") as f:
             if is_list(content) and self.key:
                 logger.error("list of data and keys are not supported, encrypt before sending to file")
 
@@ -294,8 +326,15 @@ class File:
                     f.write(encrypt(d, self.key).encode("utf8"))
                 else:
                     f.write(d.encode("utf8"))
+        self._changed()
 
-    def read_ini(self, encoding="utf8"):
+    def read_ini(self, encoding="utf8", cache=False):
+        """
+        :param cache: True TO USE THE PROCESS-WIDE CACHE OF PARSED FILES (RETURNS A COPY)
+        """
+        if cache:
+            raw = parsed_cache.get(self.os_path, ("ini", encoding), lambda: from_data(self.read_ini(encoding)))
+            return to_data(deepcopy(raw))
         buff = StringIO(self.read(encoding))
         config = ConfigParser()
         config._read(buff, "dummy")
@@ -318,6 +357,7 @@ class File:
 
         with open(self.os_path, "w") as configfile:
             config.write(configfile)
+        self._changed()
 
     def __iter__(self):
         # NOT SURE HOW TO MAXIMIZE FILE READ SPEED
@@ -330,7 +370,7 @@ class File:
                     home_path = os.path.expanduser("~")
                     path = home_path + path[1::]
 
-                with io.open(path, "rb") as f:
+                with self.profile.open(path) as f:
                     for line in f:
                         yield line.decode("utf8").rstrip()
             except Exception as e:
@@ -340,44 +380,293 @@ class File:
 
         return output()
 
-    def append(self, content, encoding="utf8"):
+    def append(self, content, encoding="utf8", lock=False, timeout=None):
         """
         add a line to file
+        :param lock: True TO LOCK THE END OF THE FILE WHILE APPENDING
+        :param timeout: SECONDS TO WAIT FOR THE LOCK
         """
         if not self.parent.exists:
             self.parent.create()
-        with open(self._filename, "ab") as output_file:
+        with self._write_lock(lock, timeout, append=True), open(self._filename, "ab") as output_file:
             if not is_text(content):
                 logger.error("expecting to write unicode only")
             output_file.write(content.encode(encoding))
             output_file.write(b"\n")
+        self._changed()
 
     def __len__(self):
         return os.path.getsize(self.abs_path)
 
+    def lock(self, exclusive=True, timeout=None, offset=0, length=0):
+        """
+        CROSS-PROCESS ADVISORY LOCK, FOR USE IN A with STATEMENT
+        :param exclusive: False FOR A SHARED (READ) LOCK
+        :param timeout: SECONDS TO WAIT BEFORE RAISING AN ERROR (None WAITS FOREVER)
+        :param offset: START OF THE LOCKED BYTES
+        :param length: NUMBER OF LOCKED BYTES (0 MEANS TO THE END OF FILE, AND BEYOND)
+        """
+        if not self.parent.exists:
+            self.parent.create()
+        return FileLock(self.os_path, exclusive, timeout, offset, length)
+
+    def _write_lock(self, lock, timeout, append):
+        if not lock:
+            return nullcontext()
+        if append:
+            # ONLY THE BYTES BEYOND THE CURRENT END, SO READERS OF THE EXISTING CONTENT ARE NOT BLOCKED
+            return FileLock(self.os_path, True, timeout, 0, 0, os.SEEK_END)
+        return FileLock(self.os_path, True, timeout)
+
+    def _changed(self):
+        # MTIME IS TOO COARSE TO SEE OUR OWN QUICK REWRITES
+        if parsed_cache:
+            parsed_cache.invalidate(self.os_path)
+        if content_cache:
+            content_cache.invalidate(self.os_path)
+
     def add(self, content):
         return self.append(content)
 
-    def extend(self, content):
+    def extend(self, content, lock=False, timeout=None):
+        """
+        :param lock: True TO LOCK THE END OF THE FILE WHILE APPENDING
+        :param timeout: SECONDS TO WAIT FOR THE LOCK
+        """
         try:
             if not self.parent.exists:
                 self.parent.create()
-            with open(self._filename, "ab") as output_file:
+            with self._write_lock(lock, timeout, append=True), open(self._filename, "ab") as output_file:
                 for c in content:
                     if not isinstance(c, text):
                         logger.error("expecting to write unicode only")
 
                     output_file.write(c.encode("utf8"))
                     output_file.write(b"\n")
+            self._changed()
         except Exception as e:
             logger.error("Could not write to file", e)
 
-    def delete(self):
+    def tail(self, n=10, encoding="utf8"):
+        """
+        :return: LIST OF THE LAST n LINES, WITHOUT READING THE WHOLE FILE
+        """
+        return _lines.tail(self.os_path, n, encoding)
+
+    def follow(self, please_stop=None, interval=0.1, encoding="utf8"):
+        """
+        GENERATOR OF LINES APPENDED AFTER THIS CALL (SURVIVES TRUNCATION AND ROTATION)
+        :param please_stop: STOP WHEN TRUE
+        :param interval: SECONDS BETWEEN LOOKING FOR NEW LINES
+        """
+        return _lines.follow(self.os_path, please_stop, interval, encoding)
+
+    def bisect(self, key, key_fn=None, encoding="utf8"):
+        """
+        GENERATOR OF LINES WITH GIVEN key, IN A FILE SORTED BY key_fn, USING O(log n) READS
+        :param key_fn: function(line) TO GET THE KEY OF A LINE (DEFAULT IS THE WHOLE LINE)
+        """
+        return _lines.bisect(self.os_path, key, key_fn, encoding)
+
+    def sort_lines(self, key=None, output=None, unique=False, run_size=_lines.DEFAULT_RUN_SIZE, processes=None):
+        """
+        SORT THE LINES OF A FILE THAT MAY BE BIGGER THAN MEMORY (EXTERNAL MERGE SORT)
+        :param key: function(line) TO SORT BY (MUST BE PICKLABLE IF processes>1)
+        :param output: FILE TO WRITE TO (DEFAULT IS TO REPLACE THIS FILE)
+        :param unique: True TO DROP DUPLICATE LINES
+        :param run_size: BYTES OF LINES SORTED IN MEMORY AT ONCE
+        :param processes: NUMBER OF PROCESSES TO SORT RUNS IN PARALLEL
+        :return: THE SORTED File
+        """
+        output = File(coalesce(output, self))
+        if not output.parent.exists:
+            output.parent.create()
+        with TempDirectory() as temp:
+            _lines.sort_lines(
+                self.os_path,
+                output.os_path,
+                temp.os_path,
+                key=key,
+                unique=unique,
+                run_size=run_size,
+                processes=processes,
+            )
+        output._changed()
+        return output
+
+    def partitions(self, n):
+        """
+        :return: LIST OF (start, end) BYTE RANGES, EACH STARTING AT A LINE START
+        """
+        return _lines.partitions(self.os_path, n)
+
+    def map_lines(self, fn, workers=None, encoding="utf8"):
+        """
+        GENERATOR OF fn(line), IN FILE ORDER, COMPUTED BY workers PROCESSES
+        :param fn: function(line) (MUST BE PICKLABLE IF workers>1)
+        :param workers: NUMBER OF PROCESSES (DEFAULT IS ONE PER CPU)
+        """
+        return _lines.map_lines(self.os_path, fn, workers, encoding)
+
+    def reduce_lines(self, fn, combine, initial=None, workers=None, encoding="utf8"):
+        """
+        FOLD THE LINES OF EACH PART IN PARALLEL, THEN combine THE PARTS
+        :param fn: function(accumulator, line) -> accumulator
+        :param combine: function(accumulator, accumulator) -> accumulator
+        :param initial: STARTING accumulator FOR EACH PART
+        :param workers: NUMBER OF PROCESSES (DEFAULT IS ONE PER CPU)
+        """
+        return _lines.reduce_lines(self.os_path, fn, combine, initial, workers, encoding)
+
+    @property
+    def lines(self):
+        """
+        RANDOM ACCESS TO LINES: file.lines[i], file.lines[a:b], len(file.lines)
+        THE INDEX IS PERSISTED NEXT TO THE FILE (WITH .idx EXTENSION) AND REBUILT WHEN THE FILE CHANGES.
+        AN EXISTING .idx THAT IS NOT AN INDEX IS LEFT ALONE, AND THE INDEX KEPT IN MEMORY.
+        THE .idx IS A REGULAR FILE, SO children AND leaves LIST IT; delete() REMOVES IT
+        """
+        index = self.__dict__.get("_line_index")
+        if index is None or not index.is_valid():
+            index = self._line_index = _lines.LineIndex(self.os_path, self.os_path + ".idx")
+        return index
+
+    def line(self, i):
+        """
+        :return: LINE NUMBER i (ZERO-BASED)
+        """
+        return self.lines[i]
+
+    def read_columns(self, columns=None, types=None, delimiter="\t", header=False, encoding="utf8", use_numpy=None):
+        """
+        READ DELIMITED FILE INTO COLUMNS (SEE mo_files.columns)
+        :param columns: NAMES (WITH header) OR INDEXES OF THE COLUMNS TO KEEP (DEFAULT ALL)
+        :param types: MAP FROM COLUMN (NAME OR INDEX) TO int, float, str, bytes OR A FUNCTION OF THE TEXT (DEFAULT str)
+        :return: {column: VALUES}
+        """
+        from mo_files import columns as _columns
+
+        return _columns.read_columns(
+            self.os_path,
+            columns,
+            types,
+            delimiter=delimiter,
+            header=header,
+            encoding=encoding,
+            use_numpy=use_numpy,
+        )
+
+    def iter_columns(
+        self, columns=None, types=None, delimiter="\t", header=False, block_size=None, encoding="utf8", use_numpy=None,
+    ):
+        """
+        :return: GENERATOR OF {column: VALUES}, ONE FOR EACH block_size BYTES OF THE FILE
+        """
+        from mo_files import columns as _columns
+
+        return _columns.iter_columns(
+            self.os_path,
+            columns,
+            types,
+            delimiter=delimiter,
+            header=header,
+            block_size=block_size or _columns.DEFAULT_BLOCK_SIZE,
+            encoding=encoding,
+            use_numpy=use_numpy,
+        )
+
+    def read_range(self, offset, length):
+        """
+        :return: UP TO length BYTES STARTING AT offset
+        """
+        if self.key:
+            logger.error("Can not read range of encrypted file {filename}", filename=self.abs_path)
+        return _ranges.read_range(self.os_path, offset, length)
+
+    def read_ranges(self, ranges, max_gap=_ranges.DEFAULT_MAX_GAP, concurrent=False):
+        """
+        :param ranges: LIST OF (offset, length)
+        :param max_gap: RANGES THIS CLOSE ARE READ WITH ONE pread
+        :param concurrent: True TO ISSUE THE READS IN PARALLEL
+        :return: LIST OF BYTES, ONE FOR EACH RANGE
+        """
+        if self.key:
+            logger.error("Can not read range of encrypted file {filename}", filename=self.abs_path)
+        return _ranges.read_ranges(self.os_path, ranges, max_gap, concurrent)
+
+    async def aread(self, encoding="utf8") -> str:
+        from mo_files import aio
+
+        return await aio.run(self.read, encoding)
+
+    async def aread_bytes(self):
+        from mo_files import aio
+
+        return await aio.run(self.read_bytes)
+
+    async def aread_json(self, encoding="utf8", flexible=True, leaves=True):
+        from mo_files import aio
+
+        return await aio.run(self.read_json, encoding, flexible, leaves)
+
+    def aread_lines(self, encoding="utf8", block_size=None):
+        """
+        :return: ASYNC GENERATOR OF LINES
+        """
+        from mo_files import aio
+
+        return aio.read_lines(self, encoding, block_size)
+
+    def __aiter__(self):
+        from mo_files import aio
+
+        return aio.read_lines(self)
+
+    async def awrite(self, content):
+        from mo_files import aio
+
+        return await aio.run(self.write, content)
+
+    async def awrite_bytes(self, content):
+        from mo_files import aio
+
+        return await aio.run(self.write_bytes, content)
+
+    async def aappend(self, content, encoding="utf8"):
+        from mo_files import aio
+
+        return await aio.run(self.append, content, encoding)
+
+    async def aextend(self, content):
+        from mo_files import aio
+
+        return await aio.run(self.extend, content)
+
+    def delete(self, background=False):
+        """
+        :param background: True TO RETURN IMMEDIATELY; A DIRECTORY IS MOVED INTO A HIDDEN reaper.TRASH
+                           DIRECTORY, THEN DELETED BY THE reaper (SEE reaper.progress)
+        """
         try:
-            if os.path.isdir(self._filename):
+            if background and os.path.isdir(self._filename):
+                from mo_math import randoms
+
+                path = self.os_path
+                trash_dir = os.path.join(os.path.dirname(path), TRASH)
+                trash = os.path.join(trash_dir, f"{self.name}.{randoms.filename()}")
+                try:
+                    os.makedirs(trash_dir, exist_ok=True)
+                    os.rename(path, trash)
+                except Exception:
+                    # CAN NOT RENAME (EG WINDOWS HAS A FILE OPEN), DELETE IN PLACE
+                    trash = path
+                reaper.delete(trash)
+            elif os.path.isdir(self._filename):
                 shutil.rmtree(self._filename)
             elif os.path.isfile(self._filename):
                 os.remove(self._filename)
+                _lines.remove_sidecar(self._filename + ".idx")
+            self._changed()
             return self
         except Exception as cause:
             cause = Except.wrap(cause)
@@ -413,7 +702,7 @@ class File:
     @property
     def children(self):
         try:
-            return [File(self._filename + "/" + c) for c in os.listdir(self.rel_path)]
+            return [File(self._filename + "/" + c) for c in _listdir(self.rel_path)]
         except FileNotFoundError:
             return []
 
@@ -421,12 +710,12 @@ class File:
     def descendants(self):
         yield self
         if self.is_directory():
-            for c in os.listdir(self.os_path):
+            for c in _listdir(self.os_path):
                 yield from File(self._filename + "/" + c).descendants
 
     @property
     def leaves(self):
-        for c in os.listdir(self.os_path):
+        for c in _listdir(self.os_path):
             child = File(self._filename + "/" + c)
             if child.is_directory():
                 yield from child.leaves
@@ -457,6 +746,9 @@ class File:
 
     @classmethod
     def copy(cls, from_, to_):
+        """
+        COPY FILE OR DIRECTORY, STREAMING WITH from_.profile
+        """
         _copy(File(from_), File(to_))
 
     def __data__(self):
@@ -488,9 +780,7 @@ class TempDirectory(File):
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        from mo_threads import Thread
-
-        Thread.run("delete dir " + self.stem, delete_daemon, file=self, caller_stack=get_stacktrace(1)).release()
+        reaper.delete(self.os_path)
 
 
 class TempFile(File):
@@ -505,6 +795,8 @@ class TempFile(File):
     def __init__(self, filename=None):
         if isinstance(filename, File):
             return
+        from mo_math import randoms
+
         self.temp = NamedTemporaryFile(prefix=randoms.filename(), delete=False)
         self.temp.close()
         File.__init__(self, self.temp.name)
@@ -513,23 +805,209 @@ class TempFile(File):
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        from mo_threads import Thread
+        reaper.delete(self.os_path)
+
+
+class SpooledTempFile(File):
+    """
+    A CONTEXT MANAGER FOR A TEMPORARY FILE THAT IS KEPT IN MEMORY
+    UNTIL IT GROWS BEYOND max_size, OR SOMETHING ASKS FOR ITS PATH; THEN IT IS WRITTEN TO DISK
+    WILL BE DELETED WHEN EXITED
+    """
+
+    def __new__(cls, *args, **kwargs):
+        return object.__new__(cls)
+
+    def __init__(self, max_size=2 ** 20):
+        if isinstance(max_size, File):
+            # File(spooled) RETURNS spooled, DO NOT RESET IT
+            return
+        self.key = bytearray(b"")
+        self._mime_type = None
+        self.max_size = max_size
+        self._memory = bytearray()  # None WHEN ON DISK, OR DELETED
+        self._path = None  # SET ONCE ON DISK
+
+    @property
+    def _filename(self):
+        if self._path is None:
+            self._spill()
+        return self._path
+
+    @property
+    def spilled(self):
+        return self._path is not None
+
+    def _spill(self):
+        from mo_math import randoms
+
+        temp = NamedTemporaryFile(prefix=randoms.filename(), delete=False)
+        with temp:
+            temp.write(self._memory or b"")
+        self._path = temp.name.replace(os.sep, "/")
+        self._memory = None
+
+    def _grow(self, content):
+        self._memory += content
+        if len(self._memory) > self.max_size:
+            self._spill()
+
+    def read(self, encoding="utf8", cache=False):
+        if self._path:
+            return File.read(self, encoding, cache)
+        return self.read_bytes().decode(encoding)
+
+    def read_bytes(self, cache=False):
+        if self._path:
+            return File.read_bytes(self, cache)
+        if self._memory is None:
+            logger.error("temp file was deleted")
+        return bytes(self._memory)
+
+    def read_lines(self, encoding="utf8"):
+        if self._path:
+            yield from File.read_lines(self, encoding)
+            return
+        for line in io.BytesIO(self.read_bytes()):
+            yield line.decode(encoding).rstrip()
+
+    def __iter__(self):
+        return self.read_lines()
+
+    def write_bytes(self, content):
+        if self._path:
+            return File.write_bytes(self, content)
+        self._memory = bytearray()
+        self._grow(content)
+
+    def write(self, content, lock=False, timeout=None):
+        if self._path:
+            return File.write(self, content, lock, timeout)
+        if isinstance(content, text):
+            content = [content]
+        self._memory = bytearray()
+        content = iter(content)
+        for d in content:
+            if not is_text(d):
+                logger.error("Expecting unicode data only")
+            self._grow(d.encode("utf8"))
+            if self._path:
+                # SPILLED, THE REST GOES STRAIGHT TO DISK
+                with open(self._path, "ab") as f:
+                    for d in content:
+                        if not is_text(d):
+                            logger.error("Expecting unicode data only")
+                        f.write(d.encode("utf8"))
+                return
+
+    def append(self, content, encoding="utf8", lock=False, timeout=None):
+        if self._path:
+            return File.append(self, content, encoding, lock, timeout)
+        if not is_text(content):
+            logger.error("expecting to write unicode only")
+        if self._memory is None:
+            self._memory = bytearray()
+        self._grow(content.encode(encoding) + b"\n")
+
+    def extend(self, content, lock=False, timeout=None):
+        if self._path:
+            return File.extend(self, content, lock, timeout)
+        if self._memory is None:
+            self._memory = bytearray()
+        content = iter(content)
+        for c in content:
+            if not isinstance(c, text):
+                logger.error("expecting to write unicode only")
+            self._grow(c.encode("utf8") + b"\n")
+            if self._path:
+                File.extend(self, content)
+                return
+
+    def delete(self, background=False):
+        if self._path:
+            return File.delete(self, background)
+        self._memory = None
+        return self
 
-        Thread.run("delete file " + self.rel_path, delete_daemon, file=self, caller_stack=get_stacktrace(1),).release()
+    def __bool__(self):
+        if self._path:
+            return File.__bool__(self)
+        return self._memory is not None
+
+    __nonzero__ = __bool__
+    exists = property(__bool__)
+
+    @property
+    def length(self):
+        if self._path:
+            return os.path.getsize(self._path)
+        return len(self._memory or b"")
+
+    size = length
+
+    def __len__(self):
+        return self.length
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if self._path:
+            reaper.delete(self._path)
+        self._memory = None
+
+
+def _listdir(path):
+    # A DIRECTORY BEING DELETED IN THE BACKGROUND IS NOT THERE
+    return [c for c in os.listdir(path) if c != TRASH]
 
 
 def _copy(from_, to_):
     if from_.is_directory():
-        for c in os.listdir(from_.os_path):
+        for c in _listdir(from_.os_path):
             _copy(from_ / c, to_ / c)
-    else:
+    elif from_.key or to_.key:
         File.new_instance(to_).write_bytes(File.new_instance(from_).read_bytes())
+    else:
+        if to_.abs_path == from_.abs_path or (to_.exists and os.path.samefile(from_.os_path, to_.os_path)):
+            # OPENING to_ WOULD TRUNCATE from_
+            return
+        if not to_.parent.exists:
+            to_.parent.create()
+        profile = from_.profile
+        with profile.open(from_.os_path) as source, open(to_.os_path, "wb", buffering=0) as destination:
+            _copy_bytes(source, destination, profile.buffering)
+        to_._changed()
+
+
+def _copy_bytes(source, destination, buffering):
+    if hasattr(os, "sendfile"):
+        offset = 0
+        try:
+            # THE KERNEL COPIES, NOTHING PASSES THROUGH PYTHON
+            in_fd, out_fd = source.fileno(), destination.fileno()
+            while True:
+                sent = os.sendfile(out_fd, in_fd, offset, 2 ** 30)
+                if not sent:
+                    return
+                offset += sent
+        except OSError:
+            if offset:
+                raise
+    shutil.copyfileobj(source, destination, buffering)
+
+
+def _read_all(filename):
+    with open(filename, "rb") as f:
+        return f.read()
 
 
 def base642bytearray(value):
     if value == None:
         return bytearray(b"")
     else:
+        import base64
+
         return bytearray(base64.b64decode(value))
 
 
@@ -595,26 +1073,6 @@ def join_path(*path):
     return joined
 
 
-def delete_daemon(file, caller_stack, please_stop):
-    # WINDOWS WILL HANG ONTO A FILE FOR A BIT AFTER WE CLOSED IT
-    from mo_threads import Till
-
-    num_attempts = 0
-    while not please_stop:
-        try:
-            if file.exists:
-                return
-            file.delete()
-            return
-        except Exception as e:
-            e = Except.wrap(e)
-            e.trace = e.trace[0:2] + caller_stack
-            if num_attempts:
-                logger.warning("problem deleting file {file}", file=file.abs_path, cause=e)
-            (Till(seconds=10) | please_stop).wait()
-        num_attempts += 1
-
-
 def add_suffix(filename, suffix):
     """
     ADD .suffix TO THE filename (NOT INCLUDING THE FILE EXTENSION)
@@ -632,30 +1090,43 @@ def add_suffix(filename, suffix):
 
 
 def apply_functions(node):
+    """
+    EVALUATE THE $-FUNCTIONS (SEE functions) FOUND IN node, BOTTOM-UP
+    node IS UPDATED IN PLACE, ONLY THE CONTAINERS HOLDING A FUNCTION ARE CHANGED
+    :return: THE NEW node
+    """
     node = from_data(node)
-    if is_data(node):
-        output = {}
-        diff = False
+    if isinstance(node, dict):
+        name = None
+        missing = None
         for k, v in node.items():
-            if k == "$concat":
-                diff = True
-                if not is_sequence(v):
-                    logger.error("$concat expects an array of strings")
-                return coalesce(node.get("separator"), "").join(apply_functions(vv) for vv in v)
-            elif is_missing(v):
-                diff = True
+            if is_missing(v):
+                missing = missing or []
+                missing.append(k)
                 continue
-            else:
-                vv = apply_functions(v)
-                diff = diff or vv is not v
-                output[k] = vv
-        return output if diff else node
-    elif is_list(node):
-        output = []
-        diff = False
-        for v in node:
+            if k in functions:
+                name = k
+            vv = apply_functions(v)
+            if vv is not v:
+                node[k] = vv
+        for k in missing or ():
+            del node[k]
+        if name:
+            return functions[name](node)
+    elif isinstance(node, list):
+        for i, v in enumerate(node):
             vv = apply_functions(v)
-            diff = diff or vv is not v
-            output.append(vv)
-        return output if diff else node
+            if vv is not v:
+                node[i] = vv
     return node
+
+
+def _concat(node):
+    terms = node["$concat"]
+    if not is_sequence(terms):
+        logger.error("$concat expects an array of strings")
+    return coalesce(node.get("separator"), "").join(terms)
+
+
+# MAP FROM $-FUNCTION NAME TO function(node), WHERE node IS THE (EVALUATED) dict HOLDING THE NAME
+functions = {"$concat": _concat}
@@ -0,0 +1,74 @@
+# encoding: utf-8
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at https://www.mozilla.org/en-US/MPL/2.0/.
+#
+# Contact: Kyle Lahnakoski (kyle@lahnakoski.com)
+#
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from threading import Lock
+
+DEFAULT_BLOCK_SIZE = 2 ** 20
+
+_lock = Lock()
+_pool = None
+_max_workers = min(32, (os.cpu_count() or 1) + 4)
+
+
+def set_max_workers(max_workers):
+    """
+    SET THE NUMBER OF THREADS SHARED BY ALL ASYNC FILE OPERATIONS
+    """
+    global _pool, _max_workers
+    with _lock:
+        _max_workers = max_workers
+        old, _pool = _pool, None
+    if old:
+        old.shutdown(wait=False)
+
+
+def get_pool():
+    """
+    :return: THE SHARED, BOUNDED, I/O THREAD POOL
+    """
+    global _pool
+    pool = _pool
+    if pool:
+        return pool
+    with _lock:
+        if not _pool:
+            _pool = ThreadPoolExecutor(max_workers=_max_workers, thread_name_prefix="mo-files-io")
+        return _pool
+
+
+async def run(func, *args, **kwargs):
+    """
+    RUN BLOCKING func ON THE I/O POOL, WITHOUT STALLING THE EVENT LOOP
+    """
+    return await asyncio.get_running_loop().run_in_executor(get_pool(), partial(func, *args, **kwargs))
+
+
+async def read_lines(file, encoding="utf8", block_size=None):
+    """
+    ASYNC GENERATOR OF LINES, READ IN LARGE BLOCKS
+    """
+    block_size = block_size or DEFAULT_BLOCK_SIZE
+    f = await run(open, file.os_path, "rb")
+    try:
+        remainder = b""
+        while True:
+            block = await run(f.read, block_size)
+            if not block:
+                break
+            lines = (remainder + block).split(b"\n")
+            remainder = lines.pop()
+            for line in lines:
+                yield line.decode(encoding).rstrip()
+        if remainder:
+            yield remainder.decode(encoding).rstrip()
+    finally:
+        await run(f.close)
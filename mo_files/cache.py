@@ -0,0 +1,113 @@
+# encoding: utf-8
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at https://www.mozilla.org/en-US/MPL/2.0/.
+#
+# Contact: Kyle Lahnakoski (kyle@lahnakoski.com)
+#
+import os
+from collections import OrderedDict
+from threading import Lock
+
+DEFAULT_MAX_BYTES = 2 ** 26
+
+
+class StatCache:
+    """
+    LRU OF VALUES DERIVED FROM FILES, EACH VALID WHILE THE FILE'S (size, mtime_ns) DOES NOT CHANGE
+    MEMORY IS BOUNDED BY THE TOTAL SIZE OF THE FILES CACHED (ONCE PER VARIANT)
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, max_item_bytes=None):
+        """
+        :param max_bytes: TOTAL SIZE OF THE FILES CACHED
+        :param max_item_bytes: LARGER FILES ARE NOT CACHED (DEFAULT max_bytes)
+        """
+        self.max_bytes = max_bytes
+        self.max_item_bytes = max_item_bytes or max_bytes
+        self.lock = Lock()
+        # MAP FROM path TO (stamp, cost, {variant: value})
+        self.entries = OrderedDict()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, path, variant, compute):
+        """
+        :param path: OS PATH OF THE FILE
+        :param variant: HASHABLE DESCRIPTION OF WHAT IS DERIVED FROM THE FILE
+        :param compute: CALLED WHEN THERE IS NO VALID VALUE
+        :return: THE (SHARED) VALUE - DO NOT CHANGE IT
+        """
+        stat = os.stat(path)
+        stamp = stat.st_size, stat.st_mtime_ns
+        with self.lock:
+            entry = self.entries.get(path)
+            if entry and entry[0] == stamp and variant in entry[2]:
+                self.entries.move_to_end(path)
+                self.hits += 1
+                return entry[2][variant]
+            self.misses += 1
+
+        value = compute()
+
+        cost = stat.st_size
+        if cost > self.max_item_bytes:
+            return value
+        with self.lock:
+            entry = self.entries.pop(path, None)
+            if entry and entry[0] == stamp:
+                _, old_cost, values = entry
+                if variant not in values:
+                    old_cost += cost
+                    self.total_bytes += cost
+                values[variant] = value
+                self.entries[path] = stamp, old_cost, values
+            else:
+                if entry:
+                    self.total_bytes -= entry[1]
+                self.entries[path] = stamp, cost, {variant: value}
+                self.total_bytes += cost
+            while self.total_bytes > self.max_bytes:
+                _, (_, old_cost, _) = self.entries.popitem(last=False)
+                self.total_bytes -= old_cost
+                self.evictions += 1
+        return value
+
+    def invalidate(self, path):
+        with self.lock:
+            entry = self.entries.pop(path, None)
+            if entry:
+                self.total_bytes -= entry[1]
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.total_bytes = 0
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def stats(self):
+        with self.lock:
+            requests = self.hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "bytes": self.total_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / requests if requests else None,
+            }
+
+    def __len__(self):
+        return len(self.entries)
+
+
+# PARSED CONTENT OF read_json() AND read_ini()
+parsed_cache = StatCache()
+
+# CONTENT OF SMALL FILES FOR read(cache=True) AND read_bytes(cache=True)
+content_cache = StatCache(max_item_bytes=2 ** 20)
@@ -0,0 +1,193 @@
+# encoding: utf-8
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at https://www.mozilla.org/en-US/MPL/2.0/.
+#
+# Contact: Kyle Lahnakoski (kyle@lahnakoski.com)
+#
+"""
+READ DELIMITED (TSV, CSV) FILES INTO COLUMNS
+
+    File("data.tab").read_columns(columns=[0, 3], types={0: int, 3: float})
+
+EACH BLOCK IS SPLIT ONCE, AND EACH COLUMN IS A STRIDED SLICE OF THE FIELDS, SO THERE IS NO PYTHON
+LOOP PER LINE. int AND float COLUMNS ARE array.array("q") AND array.array("d"), OR NumPy ARRAYS
+WHEN NumPy IS INSTALLED; OTHER COLUMNS ARE LISTS
+"""
+import csv
+import io
+from array import array
+
+from mo_logs import logger
+
+DEFAULT_BLOCK_SIZE = 2 ** 18
+
+
+def iter_columns(
+    path,
+    columns=None,
+    types=None,
+    delimiter="\t",
+    header=False,
+    block_size=DEFAULT_BLOCK_SIZE,
+    encoding="utf8",
+    use_numpy=None,
+):
+    """
+    :param path: OS PATH OF THE FILE
+    :param columns: NAMES (WITH header) OR INDEXES OF THE COLUMNS TO KEEP (DEFAULT ALL)
+    :param types: MAP FROM COLUMN (NAME OR INDEX) TO int, float, str, bytes OR A FUNCTION OF ONE
+                  DECODED FIELD (DEFAULT str)
+    :param delimiter: FIELD SEPARATOR; QUOTED FIELDS ARE SUPPORTED, BUT MUST NOT HOLD NEWLINES
+    :param header: True IF THE FIRST LINE HAS THE COLUMN NAMES
+    :param block_size: BYTES PER CHUNK (ROUNDED TO WHOLE LINES)
+    :param use_numpy: None TO USE NumPy IF INSTALLED, False TO ALWAYS USE array
+    :return: GENERATOR OF {column: VALUES}, ONE PER BLOCK
+    """
+    types = types or {}
+    np = _numpy(use_numpy)
+    delim = delimiter.encode(encoding)
+    names = None
+    selected = None
+    width = None
+    with open(path, "rb") as f:
+        remainder = b""
+        while True:
+            block = f.read(block_size)
+            data = remainder + block
+            if block:
+                end = data.rfind(b"\n")
+                if end == -1:
+                    remainder = data
+                    continue
+                data, remainder = data[:end], data[end + 1 :]
+            else:
+                remainder = b""
+            if b"\r" in data:
+                data = data.replace(b"\r\n", b"\n").rstrip(b"\r")
+            data = data.strip(b"\n")
+            if not data:
+                if not block:
+                    return
+                continue
+
+            if selected is None:
+                first, _, rest = data.partition(b"\n")
+                width = len(_split_rows(first, delimiter, encoding)[0])
+                if header:
+                    names = [n.decode(encoding) for n in _split_rows(first, delimiter, encoding)[0]]
+                    data = rest
+                selected = _select(names, width, columns)
+                needed = set(index for _, index in selected)
+                for column in types:
+                    _index(names, width, column)
+                # LIST OF (key, index, type)
+                selected = [(key, index, types.get(key, types.get(index, str))) for key, index in selected]
+                if not data:
+                    continue
+
+            fields = _split(data, delim, delimiter, width, encoding, needed)
+            yield {key: _convert(fields[index], type_, key, encoding, np) for key, index, type_ in selected}
+            if not block:
+                return
+
+
+def read_columns(path, columns=None, types=None, **kwargs):
+    """
+    SAME AS iter_columns(), BUT ALL BLOCKS JOINED INTO ONE {column: VALUES}
+    """
+    chunks = {}
+    for chunk in iter_columns(path, columns, types, **kwargs):
+        for key, values in chunk.items():
+            chunks.setdefault(key, []).append(values)
+
+    output = {}
+    for key, parts in chunks.items():
+        first = parts[0]
+        if isinstance(first, (array, list)):
+            for part in parts[1:]:
+                first.extend(part)
+            output[key] = first
+        else:
+            output[key] = _numpy(True).concatenate(parts)
+    return output
+
+
+def _numpy(use_numpy):
+    if use_numpy is False:
+        return None
+    try:
+        import numpy
+
+        return numpy
+    except ImportError:
+        if use_numpy:
+            logger.error("NumPy is not installed")
+        return None
+
+
+def _select(names, width, columns):
+    """
+    :return: LIST OF (key, index)
+    """
+    if columns is None:
+        return [(name, i) for i, name in enumerate(names)] if names else [(i, i) for i in range(width)]
+    return [(column, _index(names, width, column)) for column in columns]
+
+
+def _index(names, width, column):
+    if names and column in names:
+        return names.index(column)
+    if isinstance(column, int) and 0 <= column < width:
+        return column
+    logger.error("Unknown column {column}", column=column)
+
+
+def _split(data, delim, delimiter, width, encoding, needed):
+    """
+    :param needed: INDEXES OF THE COLUMNS TO RETURN
+    :return: LIST OF FIELD SEQUENCES, ONE FOR EACH COLUMN (None FOR THOSE NOT needed)
+    """
+    if b'"' not in data and b"\n\n" not in data:
+        # EACH LINE BREAK IS KEPT AT THE END OF ITS ROW'S LAST FIELD, SO WHEN THE LAST
+        # COLUMN HAS THEM ALL, EVERY ROW HAS width FIELDS
+        num_rows = data.count(b"\n") + 1
+        flat = data.replace(b"\n", b"\n" + delim).split(delim)
+        if len(flat) == num_rows * width:
+            last = b"".join(flat[width - 1 :: width])
+            if last.count(b"\n") == num_rows - 1:
+                output = [flat[i::width] if i in needed else None for i in range(width - 1)]
+                output.append(last.split(b"\n") if width - 1 in needed else None)
+                return output
+    # QUOTES, BLANK LINES, OR RAGGED ROWS
+    rows = [r for r in _split_rows(data, delimiter, encoding) if r]
+    for i, row in enumerate(rows):
+        if len(row) != width:
+            logger.error("Expecting {width} fields, not {num} in row {row}", width=width, num=len(row), row=row)
+    return [[row[i] for row in rows] if i in needed else None for i in range(width)]
+
+
+def _split_rows(data, delimiter, encoding):
+    if b'"' not in data:
+        return [line.split(delimiter.encode(encoding)) if line else [] for line in data.split(b"\n")]
+    return [[v.encode(encoding) for v in row] for row in csv.reader(io.StringIO(data.decode(encoding)), delimiter=delimiter)]
+
+
+def _convert(values, type_, key, encoding, np):
+    try:
+        if type_ is int:
+            if np:
+                return np.array(values).astype(np.int64)
+            return array("q", map(int, values))
+        if type_ is float:
+            if np:
+                return np.array(values).astype(np.float64)
+            return array("d", map(float, values))
+        if type_ is str:
+            return [v.decode(encoding) for v in values]
+        if type_ is bytes:
+            return list(values)
+        return [type_(v.decode(encoding)) for v in values]
+    except Exception as cause:
+        logger.error("Can not convert column {column} to {type}", column=key, type=getattr(type_, "__name__", type_), cause=cause)
@@ -0,0 +1,364 @@
+# encoding: utf-8
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at https://www.mozilla.org/en-US/MPL/2.0/.
+#
+# Contact: Kyle Lahnakoski (kyle@lahnakoski.com)
+#
+"""
+CALLBACKS AROUND EACH File AND URL OPERATION
+
+    def end(span):
+        tracer.record(span.operation, span.path, span.bytes, span.duration)
+
+    hook = hooks.add(end=end, operations=["read", "write"])
+    ...
+    hook.remove()
+
+start(span) IS CALLED BEFORE THE OPERATION, end(span) AFTER, AND manager(span) RETURNS A CONTEXT
+MANAGER THAT IS ENTERED AROUND IT. THE MEASURED METHODS ARE ONLY REPLACED WHILE SOME HOOK IS
+REGISTERED, SO THERE IS NO COST OTHERWISE.
+
+Span.syscalls IS ONLY COUNTED AFTER SOME add(syscalls=True). THAT INSTALLS AN AUDIT HOOK
+(sys.addaudithook), WHICH CAN NOT BE REMOVED: FROM THEN ON, EVERY AUDITED EVENT IN THE PROCESS
+(EVERY open(), import, compile, ...) CALLS A PYTHON FUNCTION, EVEN AFTER THE HOOK IS REMOVED.
+"""
+import os
+import sys
+from functools import wraps
+from threading import Lock, local
+from time import perf_counter
+
+from mo_logs import logger
+
+FILESYSTEM_EVENTS = {
+    "open",
+    "os.listdir",
+    "os.scandir",
+    "os.mkdir",
+    "os.remove",
+    "os.rename",
+    "os.rmdir",
+    "os.truncate",
+    "os.utime",
+    "shutil.copyfile",
+    "shutil.rmtree",
+}
+
+_lock = Lock()
+_local = local()
+_hooks = []
+_originals = {}  # MAP FROM (class, name) TO ORIGINAL ATTRIBUTE
+_audit_installed = False
+
+
+class Span:
+    """
+    ONE CALL OF ONE OPERATION
+    """
+
+    __slots__ = ["operation", "path", "bytes", "items", "syscalls", "start", "duration", "error"]
+
+    def __init__(self, operation, path):
+        self.operation = operation
+        self.path = path  # ABSOLUTE OS PATH OF THE File, None FOR URL OPERATIONS
+        self.bytes = 0
+        self.items = 0  # LINES OR FILES GENERATED
+        self.syscalls = 0  # FILESYSTEM AUDIT EVENTS (ONLY COUNTED AFTER add(syscalls=True))
+        self.start = None  # perf_counter() AT START
+        self.duration = 0.0  # SECONDS, FOR GENERATORS ONLY THE TIME SPENT INSIDE
+        self.error = None  # THE EXCEPTION RAISED, IF ANY
+
+
+class Hook:
+    def __init__(self, start, end, manager, operations):
+        self.start = start
+        self.end = end
+        self.manager = manager
+        self.operations = set(operations) if operations else None
+
+    def remove(self):
+        remove(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.remove()
+
+
+def add(start=None, end=None, manager=None, operations=None, syscalls=False):
+    """
+    :param start: CALLED WITH THE Span BEFORE THE OPERATION
+    :param end: CALLED WITH THE Span AFTER THE OPERATION, EVEN IF IT FAILED
+    :param manager: CALLED WITH THE Span, RETURNS CONTEXT MANAGER ENTERED AROUND THE OPERATION
+    :param operations: NAMES OF THE OPERATIONS TO HOOK (DEFAULT ALL, SEE operations())
+    :param syscalls: True TO COUNT Span.syscalls, AT A SMALL COST TO THE WHOLE PROCESS, FOREVER (SEE ABOVE)
+    :return: Hook, WHICH CAN BE USED AS A CONTEXT MANAGER
+    """
+    global _audit_installed
+    unknown = set(operations or ()) - set(t[2] for t in _targets())
+    if unknown:
+        logger.error("unknown operations {names}", names=sorted(unknown))
+    hook = Hook(start, end, manager, operations)
+    with _lock:
+        if syscalls and not _audit_installed:
+            # AUDIT HOOKS CAN NOT BE REMOVED, SO IT DOES NOTHING WHEN THERE ARE NO SPANS
+            sys.addaudithook(_audit)
+            _audit_installed = True
+        if not _originals:
+            for cls, name, operation, size in _targets():
+                original = cls.__dict__[name]
+                _originals[(cls, name)] = original
+                setattr(cls, name, _wrap(original, operation, size))
+        _hooks.append(hook)
+    return hook
+
+
+def remove(hook):
+    with _lock:
+        if hook in _hooks:
+            _hooks.remove(hook)
+        if not _hooks:
+            for (cls, name), original in _originals.items():
+                setattr(cls, name, original)
+            _originals.clear()
+
+
+def operations():
+    """
+    :return: NAMES OF THE OPERATIONS THAT CAN BE HOOKED
+    """
+    return sorted(set(t[2] for t in _targets()))
+
+
+def _targets():
+    from mo_files import File
+    from mo_files.url import URL
+
+    return [
+        (File, "read", "read", _text_size),
+        (File, "read_bytes", "read_bytes", _result_size),
+        (File, "read_lines", "read_lines", _line_size),
+        (File, "__iter__", "read_lines", _line_size),
+        (File, "read_json", "read_json", _no_size),
+        (File, "read_ini", "read_ini", _no_size),
+        (File, "write", "write", _content_size),
+        (File, "write_bytes", "write_bytes", _content_size),
+        (File, "append", "append", _append_size),
+        (File, "extend", "extend", _no_size),
+        (File, "copy", "copy", _copy_size),
+        (File, "delete", "delete", _no_size),
+        (File, "descendants", "descendants", _item_size),
+        (File, "leaves", "leaves", _item_size),
+        (File, "find", "find", _item_size),
+        (URL, "__init__", "url.parse", _url_size),
+        (URL, "__str__", "url.format", _result_size),
+    ]
+
+
+def _audit(event, args):
+    if event in FILESYSTEM_EVENTS:
+        stack = getattr(_local, "stack", None)
+        if stack:
+            stack[-1].syscalls += 1
+
+
+def _stack():
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    return stack
+
+
+def _path_of(args):
+    # THE File IS self, OR THE FIRST ARGUMENT OF A classmethod
+    for a in args[:2]:
+        if not isinstance(a, type):
+            filename = _filename_of(a)
+            return os.path.abspath(filename) if filename else None
+    return None
+
+
+def _filename_of(value):
+    """
+    PATH OF A File, OR None, WITHOUT SIDE EFFECTS (SpooledTempFile._filename WRITES IT TO DISK)
+    """
+    attributes = getattr(value, "__dict__", None)
+    if not attributes:
+        return None
+    if "_filename" in attributes:
+        return attributes["_filename"]
+    # SpooledTempFile, None UNTIL IT SPILLS
+    return attributes.get("_path")
+
+
+def _begin(operation, args):
+    span = Span(operation, _path_of(args))
+    hooks = [h for h in _hooks if h.operations is None or operation in h.operations]
+    managers = []
+    for h in hooks:
+        try:
+            if h.start:
+                h.start(span)
+            if h.manager:
+                m = h.manager(span)
+                m.__enter__()
+                managers.append(m)
+        except Exception as cause:
+            logger.warning("hook failed at start of {operation}", operation=operation, cause=cause)
+    return span, hooks, managers
+
+
+def _finish(span, hooks, managers):
+    error = span.error
+    exc_info = (type(error), error, error.__traceback__) if error else (None, None, None)
+    for m in reversed(managers):
+        try:
+            m.__exit__(*exc_info)
+        except Exception as cause:
+            logger.warning("hook failed at end of {operation}", operation=span.operation, cause=cause)
+    for h in hooks:
+        try:
+            if h.end:
+                h.end(span)
+        except Exception as cause:
+            logger.warning("hook failed at end of {operation}", operation=span.operation, cause=cause)
+
+
+def _wrap(original, operation, size):
+    if isinstance(original, classmethod):
+        return classmethod(_wrap(original.__func__, operation, size))
+    if isinstance(original, property):
+        return property(_wrap(original.fget, operation, size), original.fset, original.fdel, original.__doc__)
+    if size in (_line_size, _item_size):
+        return _wrap_generator(original, operation, size)
+
+    @wraps(original)
+    def wrapper(*args, **kwargs):
+        span, hooks, managers = _begin(operation, args)
+        stack = _stack()
+        stack.append(span)
+        result = None
+        span.start = perf_counter()
+        try:
+            result = original(*args, **kwargs)
+            span.bytes = size(args, kwargs, result)
+            return result
+        except BaseException as cause:
+            span.error = cause
+            raise
+        finally:
+            span.duration = perf_counter() - span.start
+            stack.pop()
+            _finish(span, hooks, managers)
+
+    return wrapper
+
+
+def _wrap_generator(original, operation, size):
+    @wraps(original)
+    def wrapper(*args, **kwargs):
+        stack = _stack()
+        if stack and stack[-1].operation == operation:
+            # RECURSIVE TRAVERSAL IS PART OF THE OUTER SPAN
+            return original(*args, **kwargs)
+
+        def output():
+            span, hooks, managers = _begin(operation, args)
+            span.start = perf_counter()
+            try:
+                items = original(*args, **kwargs)
+                while True:
+                    start = perf_counter()
+                    stack.append(span)
+                    try:
+                        item = next(items)
+                    except StopIteration:
+                        return
+                    finally:
+                        stack.pop()
+                        span.duration += perf_counter() - start
+                    span.items += 1
+                    span.bytes += size(item)
+                    yield item
+            except BaseException as cause:
+                if not isinstance(cause, GeneratorExit):
+                    span.error = cause
+                raise
+            finally:
+                _finish(span, hooks, managers)
+
+        return output()
+
+    return wrapper
+
+
+def _no_size(args, kwargs, result):
+    return 0
+
+
+def _result_size(args, kwargs, result):
+    return _num_bytes(result) if result else 0
+
+
+def _text_size(args, kwargs, result):
+    # File.read(encoding)
+    encoding = args[1] if len(args) > 1 else kwargs.get("encoding", "utf8")
+    return _num_bytes(result, encoding) if result else 0
+
+
+def _content_size(args, kwargs, result):
+    content = args[1] if len(args) > 1 else kwargs.get("content")
+    if isinstance(content, (str, bytes, bytearray)):
+        return _num_bytes(content)
+    if isinstance(content, (list, tuple)):
+        return sum(_num_bytes(c) for c in content)
+    return 0
+
+
+def _append_size(args, kwargs, result):
+    # File.append(content, encoding)
+    content = args[1] if len(args) > 1 else kwargs.get("content")
+    encoding = args[2] if len(args) > 2 else kwargs.get("encoding", "utf8")
+    return _num_bytes(content, encoding) + 1 if isinstance(content, str) else 0
+
+
+def _num_bytes(value, encoding="utf8"):
+    """
+    BYTES MOVED FOR value, WHICH IS NOT len() OF A str
+    """
+    if isinstance(value, str):
+        if value.isascii() and encoding in ("utf8", "utf-8"):
+            return len(value)
+        return len(value.encode(encoding, "replace"))
+    return len(value)
+
+
+def _copy_size(args, kwargs, result):
+    source = args[1] if len(args) > 1 else kwargs.get("from_")
+    try:
+        if isinstance(source, str):
+            return os.path.getsize(source)
+        filename = _filename_of(source)
+        if filename:
+            return os.path.getsize(filename)
+        # SpooledTempFile STILL IN MEMORY
+        memory = getattr(source, "_memory", None)
+        return len(memory) if memory else 0
+    except Exception:
+        return 0
+
+
+def _url_size(args, kwargs, result):
+    value = args[1] if len(args) > 1 else None
+    return len(value) if isinstance(value, str) else 0
+
+
+def _line_size(line):
+    return _num_bytes(line) + 1
+
+
+def _item_size(item):
+    return 0
@@ -0,0 +1,140 @@
+# encoding: utf-8
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at https://www.mozilla.org/en-US/MPL/2.0/.
+#
+# Contact: Kyle Lahnakoski (kyle@lahnakoski.com)
+#
+"""
+OPT-IN COUNTERS FOR File AND URL OPERATIONS
+
+    instrument.enable(prefixes=["/data"])
+    ...
+    instrument.snapshot()
+
+THE COUNTERS ARE A hooks.add() CALLBACK, SO THERE IS NO COST WHEN DISABLED.
+
+"syscalls" ARE THE FILESYSTEM AUDIT EVENTS (open, os.remove, os.listdir, ...) RAISED WHILE THE
+OPERATION RUNS IN THE SAME THREAD. THEY ARE ONLY COUNTED WITH enable(syscalls=True), WHICH INSTALLS
+AN AUDIT HOOK THAT CAN NOT BE REMOVED: EVERY open(), import, ETC IN THE PROCESS PAYS A LITTLE
+FOR IT, EVEN AFTER disable()
+"""
+import os
+from threading import Lock
+
+from mo_files import hooks
+
+_lock = Lock()
+_hook = None
+_prefixes = ()
+_stats = {}  # MAP FROM operation TO Stats
+_by_prefix = {}  # MAP FROM prefix TO (MAP FROM operation TO Stats)
+
+
+class Stats:
+    __slots__ = ["count", "errors", "bytes", "syscalls", "seconds", "max_seconds", "histogram"]
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.bytes = 0
+        self.syscalls = 0
+        self.seconds = 0.0
+        self.max_seconds = 0.0
+        # MAP FROM bit_length(MICROSECONDS) TO COUNT; BUCKET b HOLDS DURATIONS UNDER 2**b MICROSECONDS
+        self.histogram = {}
+
+    def add(self, duration, num_bytes, syscalls, error):
+        self.count += 1
+        self.errors += error
+        self.bytes += num_bytes
+        self.syscalls += syscalls
+        self.seconds += duration
+        if duration > self.max_seconds:
+            self.max_seconds = duration
+        bucket = int(duration * 1_000_000).bit_length()
+        self.histogram[bucket] = self.histogram.get(bucket, 0) + 1
+
+    def __data__(self):
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "bytes": self.bytes,
+            "syscalls": self.syscalls,
+            "seconds": self.seconds,
+            "max_seconds": self.max_seconds,
+            "histogram": {f"<{2 ** b}us": n for b, n in sorted(self.histogram.items())},
+        }
+
+
+def enable(prefixes=None, syscalls=False):
+    """
+    START RECORDING
+    :param prefixes: ALSO RECORD BY THE LONGEST OF THESE ABSOLUTE PATH PREFIXES THAT MATCHES
+    :param syscalls: True TO ALSO COUNT FILESYSTEM AUDIT EVENTS (A PERMANENT COST, SEE ABOVE)
+    """
+    global _hook, _prefixes
+    with _lock:
+        _prefixes = tuple(sorted((os.path.abspath(p) for p in prefixes or ()), key=len, reverse=True))
+        if not _hook:
+            _hook = hooks.add(end=_record, syscalls=syscalls)
+        elif syscalls:
+            # ALREADY ENABLED WITHOUT
+            _hook.remove()
+            _hook = hooks.add(end=_record, syscalls=True)
+
+
+def disable():
+    """
+    STOP RECORDING
+    """
+    global _hook
+    with _lock:
+        if _hook:
+            _hook.remove()
+            _hook = None
+
+
+def reset():
+    with _lock:
+        _stats.clear()
+        _by_prefix.clear()
+
+
+def snapshot():
+    """
+    :return: PLAIN (JSON-SERIALIZABLE) COPY OF THE COUNTERS
+    """
+    with _lock:
+        return {
+            "operations": {op: s.__data__() for op, s in sorted(_stats.items())},
+            "by_prefix": {
+                prefix: {op: s.__data__() for op, s in sorted(ops.items())} for prefix, ops in sorted(_by_prefix.items())
+            },
+        }
+
+
+def _record(span):
+    prefix = _prefix_of(span.path) if _prefixes else None
+    error = 1 if span.error else 0
+    with _lock:
+        stats = _stats.get(span.operation)
+        if stats is None:
+            stats = _stats[span.operation] = Stats()
+        stats.add(span.duration, span.bytes, span.syscalls, error)
+        if prefix:
+            ops = _by_prefix.setdefault(prefix, {})
+            stats = ops.get(span.operation)
+            if stats is None:
+                stats = ops[span.operation] = Stats()
+            stats.add(span.duration, span.bytes, span.syscalls, error)
+
+
+def _prefix_of(path):
+    if not path:
+        return None
+    for prefix in _prefixes:
+        if path == prefix or path.startswith(prefix + os.sep):
+            return prefix
+    return None
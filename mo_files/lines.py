@@ -0,0 +1,490 @@
+# encoding: utf-8
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at https://www.mozilla.org/en-US/MPL/2.0/.
+#
+# Contact: Kyle Lahnakoski (kyle@lahnakoski.com)
+#
+import heapq
+import os
+from copy import deepcopy
+from functools import reduce
+import struct
+import sys
+import time
+from array import array
+from collections import deque
+from tempfile import mkstemp
+
+DEFAULT_BLOCK_SIZE = 2 ** 16
+INDEX_BLOCK_SIZE = 2 ** 20
+INDEX_HEADER = struct.Struct("<4sqq")
+INDEX_MAGIC = b"MOLI"
+DEFAULT_RUN_SIZE = 2 ** 26
+DEFAULT_PARTITION_SIZE = 2 ** 26
+MAX_FAN_IN = 64
+
+
+def tail(path, n, encoding="utf8", block_size=DEFAULT_BLOCK_SIZE):
+    """
+    :return: LIST OF THE LAST n LINES, READ BY SEEKING BACKWARDS FROM THE END
+    """
+    if n <= 0:
+        return []
+    with open(path, "rb") as f:
+        position = f.seek(0, os.SEEK_END)
+        blocks = []
+        newlines = 0
+        while position and newlines <= n:
+            size = min(block_size, position)
+            position -= size
+            f.seek(position)
+            block = f.read(size)
+            blocks.append(block)
+            newlines += block.count(b"\n")
+    data = b"".join(reversed(blocks))
+    if not data:
+        return []
+    lines = data.split(b"\n")
+    if data.endswith(b"\n"):
+        lines.pop()
+    if position:
+        # FIRST LINE IS PARTIAL
+        lines = lines[1:]
+    return [line.decode(encoding).rstrip() for line in lines[-n:]]
+
+
+def follow(path, please_stop=None, interval=0.1, encoding="utf8", block_size=DEFAULT_BLOCK_SIZE):
+    """
+    GENERATOR OF LINES APPENDED TO path AFTER THIS CALL
+    A TRUNCATED FILE IS READ AGAIN FROM THE START, A ROTATED (REPLACED) FILE IS REOPENED
+    :param please_stop: STOP WHEN TRUE (A Signal, threading.Event, OR ANYTHING WITH bool())
+    :param interval: SECONDS TO WAIT BEFORE LOOKING FOR MORE
+    """
+    if please_stop is None:
+        stopped = lambda: False
+    elif hasattr(please_stop, "is_set"):
+        stopped = please_stop.is_set
+    else:
+        stopped = lambda: bool(please_stop)
+
+    f, ident = _open(path, os.SEEK_END)
+
+    def output():
+        nonlocal f, ident
+        remainder = b""
+        try:
+            while not stopped():
+                block = f.read(block_size) if f else b""
+                if block:
+                    lines = (remainder + block).split(b"\n")
+                    remainder = lines.pop()
+                    for line in lines:
+                        yield line.decode(encoding).rstrip()
+                    continue
+
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    time.sleep(interval)
+                    continue
+
+                if f is None or (stat.st_dev, stat.st_ino) != ident:
+                    # ROTATED: WHAT IS LEFT OF THE OLD FILE WAS READ ABOVE
+                    if remainder:
+                        yield remainder.decode(encoding).rstrip()
+                        remainder = b""
+                    if f:
+                        f.close()
+                    f, ident = _open(path, os.SEEK_SET)
+                elif stat.st_size < f.tell():
+                    # TRUNCATED
+                    f.seek(0)
+                    remainder = b""
+                else:
+                    time.sleep(interval)
+        finally:
+            if f:
+                f.close()
+
+    return output()
+
+
+def _open(path, whence):
+    """
+    :return: (FILE HANDLE, IDENTITY) OR (None, None) IF MISSING
+    """
+    try:
+        f = open(path, "rb")
+    except FileNotFoundError:
+        return None, None
+    f.seek(0, whence)
+    stat = os.fstat(f.fileno())
+    return f, (stat.st_dev, stat.st_ino)
+
+
+def bisect(path, key, key_fn=None, encoding="utf8"):
+    """
+    GENERATOR OF LINES WHERE key_fn(line) == key
+    THE FILE MUST BE SORTED BY key_fn; THE FIRST MATCH IS FOUND WITH O(log n) SEEKS
+    :param key_fn: function(line) TO GET THE KEY OF A LINE (DEFAULT IS THE WHOLE LINE)
+    """
+    key_fn = key_fn or (lambda line: line)
+    with open(path, "rb") as f:
+        lo, hi = 0, f.seek(0, os.SEEK_END)
+        # LINES STARTING BEFORE lo ARE LESS THAN key, THE FIRST LINE STARTING AT OR AFTER hi IS NOT
+        while lo < hi:
+            mid = (lo + hi) // 2
+            start, line = _line_at(f, mid)
+            if start < hi and line and key_fn(line.decode(encoding).rstrip()) < key:
+                lo = start + len(line)
+            else:
+                hi = mid
+
+        _line_at(f, lo)
+        for line in f:
+            line = line.decode(encoding).rstrip()
+            if key_fn(line) != key:
+                break
+            yield line
+
+
+def _line_at(f, position):
+    """
+    :return: (START, BYTES) OF THE FIRST LINE STARTING AT OR AFTER position, LEAVE f AT THE START OF THAT LINE
+    """
+    if position:
+        f.seek(position - 1)
+        f.readline()
+    else:
+        f.seek(0)
+    start = f.tell()
+    line = f.readline()
+    f.seek(start)
+    return start, line
+
+
+class LineIndex:
+    """
+    RANDOM ACCESS TO THE LINES OF A FILE
+    offsets[i] IS WHERE LINE i STARTS, THE LAST OFFSET IS THE FILE SIZE
+    THE OFFSETS ARE PERSISTED IN A SIDECAR FILE, AND REBUILT WHEN THE FILE'S (size, mtime_ns) CHANGES
+    """
+
+    def __init__(self, path, sidecar=None, encoding="utf8"):
+        """
+        :param path: OS PATH OF THE LINE FILE
+        :param sidecar: OS PATH TO PERSIST THE INDEX (None TO KEEP IN MEMORY ONLY)
+        """
+        self.path = path
+        self.sidecar = sidecar
+        self.encoding = encoding
+        self.stamp = _stamp(path)
+        self.offsets = None
+        if sidecar:
+            self.offsets = _load_offsets(sidecar, self.stamp)
+        if self.offsets is None:
+            self.offsets = build_offsets(path)
+            if sidecar and is_sidecar(sidecar):
+                try:
+                    _save_offsets(sidecar, self.stamp, self.offsets)
+                except OSError:
+                    # CAN NOT WRITE NEXT TO THE FILE, KEEP IN MEMORY ONLY
+                    pass
+
+    def is_valid(self):
+        try:
+            return _stamp(self.path) == self.stamp
+        except FileNotFoundError:
+            return False
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            start, stop, step = item.indices(len(self))
+            if step != 1:
+                return [self[i] for i in range(start, stop, step)]
+            if start >= stop:
+                return []
+            data = self._read(self.offsets[start], self.offsets[stop])
+            lines = data.split(b"\n")
+            if data.endswith(b"\n"):
+                lines.pop()
+            return [line.decode(self.encoding).rstrip() for line in lines]
+
+        i = item + len(self) if item < 0 else item
+        if not 0 <= i < len(self):
+            raise IndexError("line index out of range")
+        return self._read(self.offsets[i], self.offsets[i + 1]).decode(self.encoding).rstrip()
+
+    def _read(self, start, end):
+        with open(self.path, "rb") as f:
+            f.seek(start)
+            return f.read(end - start)
+
+
+def build_offsets(path, block_size=INDEX_BLOCK_SIZE):
+    """
+    :return: array OF LINE START OFFSETS, ENDING WITH THE FILE SIZE
+    """
+    offsets = array("q", [0])
+    append = offsets.append
+    position = 0
+    with open(path, "rb") as f:
+        while True:
+            block = f.read(block_size)
+            if not block:
+                break
+            find = block.find
+            i = find(b"\n")
+            while i != -1:
+                append(position + i + 1)
+                i = find(b"\n", i + 1)
+            position += len(block)
+    if offsets[-1] != position:
+        append(position)
+    return offsets
+
+
+def _stamp(path):
+    stat = os.stat(path)
+    return stat.st_size, stat.st_mtime_ns
+
+
+def _load_offsets(sidecar, stamp):
+    try:
+        with open(sidecar, "rb") as f:
+            magic, size, mtime_ns = INDEX_HEADER.unpack(f.read(INDEX_HEADER.size))
+            if magic != INDEX_MAGIC or (size, mtime_ns) != stamp:
+                return None
+            offsets = array("q")
+            offsets.frombytes(f.read())
+    except (OSError, struct.error):
+        return None
+    if sys.byteorder == "big":
+        offsets.byteswap()
+    return offsets
+
+
+def is_sidecar(sidecar):
+    """
+    :return: True IF sidecar IS MISSING, OR IS AN INDEX WE WROTE (ANYTHING ELSE IS NOT OURS TO REPLACE)
+    """
+    try:
+        with open(sidecar, "rb") as f:
+            return f.read(len(INDEX_MAGIC)) == INDEX_MAGIC
+    except FileNotFoundError:
+        return True
+    except OSError:
+        return False
+
+
+def remove_sidecar(sidecar):
+    """
+    DELETE sidecar, IF IT IS AN INDEX
+    """
+    if os.path.isfile(sidecar) and is_sidecar(sidecar):
+        try:
+            os.remove(sidecar)
+        except FileNotFoundError:
+            pass
+
+
+def _save_offsets(sidecar, stamp, offsets):
+    if sys.byteorder == "big":
+        offsets = array("q", offsets)
+        offsets.byteswap()
+    directory, name = os.path.split(sidecar)
+    fd, temp = mkstemp(prefix=name + ".", suffix=".tmp", dir=directory or ".")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(INDEX_HEADER.pack(INDEX_MAGIC, *stamp))
+            offsets.tofile(f)
+        os.replace(temp, sidecar)
+    except BaseException:
+        os.remove(temp)
+        raise
+
+
+def sort_lines(
+    path, output, temp_dir, key=None, unique=False, run_size=DEFAULT_RUN_SIZE, processes=None, encoding="utf8",
+):
+    """
+    EXTERNAL MERGE SORT: SORTED RUNS ARE WRITTEN TO temp_dir, THEN MERGED INTO output
+    MEMORY IS BOUNDED BY ABOUT run_size BYTES OF LINES PER PROCESS
+    :param key: function(line) TO SORT BY (MUST BE PICKLABLE IF processes>1)
+    :param unique: True TO DROP DUPLICATE LINES
+    :param processes: NUMBER OF PROCESSES TO SORT RUNS IN PARALLEL
+    """
+    run_paths = (os.path.join(temp_dir, f"run{i}.txt") for i in range(sys.maxsize))
+    chunks = _read_chunks(path, run_size, encoding)
+    if processes and processes > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        from multiprocessing import get_context
+
+        runs = []
+        # spawn, BECAUSE A FORKED CHILD CAN INHERIT LOCKS HELD BY OUR OTHER THREADS
+        with ProcessPoolExecutor(processes, mp_context=get_context("spawn")) as pool:
+            pending = deque()
+            for chunk in chunks:
+                pending.append(pool.submit(_write_run, chunk, next(run_paths), key, unique, encoding))
+                if len(pending) > processes:
+                    runs.append(pending.popleft().result())
+            runs.extend(p.result() for p in pending)
+    else:
+        runs = [_write_run(chunk, next(run_paths), key, unique, encoding) for chunk in chunks]
+
+    while len(runs) > MAX_FAN_IN:
+        runs = [
+            _merge_runs(runs[i : i + MAX_FAN_IN], next(run_paths), key, unique, encoding)
+            for i in range(0, len(runs), MAX_FAN_IN)
+        ]
+
+    # WRITE NEXT TO output, SO REPLACING IT IS ATOMIC (AND path MAY BE output)
+    result = _merge_runs(runs, output + ".sorting", key, unique, encoding)
+    os.replace(result, output)
+
+
+def _read_chunks(path, run_size, encoding):
+    chunk, size = [], 0
+    with open(path, "rb") as f:
+        for line in f:
+            # ONLY THE LINE TERMINATOR, TRAILING WHITESPACE (EG EMPTY TSV COLUMNS) IS CONTENT
+            if line.endswith(b"\n"):
+                line = line[:-2] if line.endswith(b"\r\n") else line[:-1]
+            chunk.append(line.decode(encoding))
+            size += len(line) + 1
+            if size >= run_size:
+                yield chunk
+                chunk, size = [], 0
+    if chunk:
+        yield chunk
+
+
+def _write_run(lines, run_path, key, unique, encoding):
+    lines.sort(key=key)
+    _write_lines(lines, run_path, key, unique, encoding)
+    return run_path
+
+
+def _merge_runs(run_paths, output, key, unique, encoding):
+    files = [open(p, "rb") for p in run_paths]
+    try:
+        streams = [(line[:-1].decode(encoding) for line in f) for f in files]
+        _write_lines(heapq.merge(*streams, key=key), output, key, unique, encoding)
+    finally:
+        for f in files:
+            f.close()
+    for p in run_paths:
+        os.remove(p)
+    return output
+
+
+def _write_lines(lines, path, key, unique, encoding):
+    with open(path, "wb") as f:
+        write = f.write
+        if unique and key:
+            # EQUAL LINES HAVE EQUAL KEYS, BUT NEED NOT BE ADJACENT IN THE RUN OF THAT KEY
+            previous, seen = object(), set()
+            for line in lines:
+                k = key(line)
+                if k != previous:
+                    previous, seen = k, set()
+                if line not in seen:
+                    seen.add(line)
+                    write(line.encode(encoding) + b"\n")
+        elif unique:
+            previous = None
+            for line in lines:
+                if line != previous:
+                    write(line.encode(encoding) + b"\n")
+                    previous = line
+        else:
+            for line in lines:
+                write(line.encode(encoding) + b"\n")
+
+
+def partitions(path, n):
+    """
+    SPLIT THE FILE INTO (AT MOST) n BYTE RANGES, EACH STARTING AT A LINE START
+    :return: LIST OF (start, end) PAIRS
+    """
+    with open(path, "rb") as f:
+        size = f.seek(0, os.SEEK_END)
+        bounds = [0]
+        for i in range(1, n):
+            start, _ = _line_at(f, size * i // n)
+            if start > bounds[-1]:
+                bounds.append(start)
+    if size > bounds[-1]:
+        bounds.append(size)
+    return list(zip(bounds, bounds[1:]))
+
+
+def map_lines(path, fn, workers=None, encoding="utf8", partition_size=DEFAULT_PARTITION_SIZE):
+    """
+    GENERATOR OF fn(line), IN FILE ORDER; EACH WORKER PROCESS READS ONLY ITS PART OF THE FILE
+    :param fn: function(line) (MUST BE PICKLABLE IF workers>1)
+    """
+    for results in _run_ranges(path, _map_range, (fn, encoding), workers, partition_size):
+        yield from results
+
+
+def reduce_lines(path, fn, combine, initial=None, workers=None, encoding="utf8", partition_size=DEFAULT_PARTITION_SIZE):
+    """
+    :param fn: function(accumulator, line) -> accumulator, APPLIED TO EACH LINE OF A PART
+    :param combine: function(accumulator, accumulator) -> accumulator, TO MERGE THE PARTS
+    :param initial: STARTING accumulator FOR EACH PART
+    """
+    partials = list(_run_ranges(path, _reduce_range, (fn, initial, encoding), workers, partition_size))
+    if not partials:
+        return initial
+    return reduce(combine, partials)
+
+
+def _run_ranges(path, func, args, workers, partition_size):
+    workers = workers or os.cpu_count() or 1
+    size = os.path.getsize(path)
+    # MORE PARTS THAN WORKERS, SO NO ONE PART HOLDS TOO MANY RESULTS
+    ranges = partitions(path, max(workers, -(-size // partition_size)))
+    if workers == 1:
+        for start, end in ranges:
+            yield func(path, start, end, *args)
+        return
+
+    from concurrent.futures import ProcessPoolExecutor
+    from multiprocessing import get_context
+
+    with ProcessPoolExecutor(workers, mp_context=get_context("spawn")) as pool:
+        futures = deque()
+        for start, end in ranges:
+            futures.append(pool.submit(func, path, start, end, *args))
+            if len(futures) > 2 * workers:
+                yield futures.popleft().result()
+        while futures:
+            yield futures.popleft().result()
+
+
+def _read_range(path, start, end, encoding):
+    with open(path, "rb") as f:
+        f.seek(start)
+        position = start
+        for line in f:
+            yield line.decode(encoding).rstrip()
+            position += len(line)
+            if position >= end:
+                break
+
+
+def _map_range(path, start, end, fn, encoding):
+    return [fn(line) for line in _read_range(path, start, end, encoding)]
+
+
+def _reduce_range(path, start, end, fn, initial, encoding):
+    accumulator = deepcopy(initial)
+    for line in _read_range(path, start, end, encoding):
+        accumulator = fn(accumulator, line)
+    return accumulator
@@ -0,0 +1,156 @@
+# encoding: utf-8
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at https://www.mozilla.org/en-US/MPL/2.0/.
+#
+# Contact: Kyle Lahnakoski (kyle@lahnakoski.com)
+#
+"""
+ADVISORY LOCKS ON FILES, AND BYTE RANGES OF FILES, SHARED BY ALL PROCESSES ON THE MACHINE
+
+    with File("shared.json").lock(timeout=5):
+        ...
+
+ON LINUX THESE ARE "OPEN FILE DESCRIPTION" LOCKS, WHICH ALSO EXCLUDE OTHER THREADS. ELSEWHERE
+THEY ARE POSIX RECORD LOCKS (lockf), WHICH THE KERNEL GIVES TO THE WHOLE PROCESS, SO THREADS
+ARE SERIALIZED WITH AN IN-PROCESS LOCK FIRST
+"""
+import os
+import struct
+import time
+from collections import defaultdict
+from threading import Lock
+
+from mo_logs import logger
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# struct flock {short l_type; short l_whence; off_t l_start; off_t l_len; pid_t l_pid;}
+_flock = struct.Struct("hhqqi4x")
+_use_ofd = bool(fcntl) and hasattr(fcntl, "F_OFD_SETLK") and struct.calcsize("P") == 8
+
+_thread_locks_lock = Lock()
+_thread_locks = defaultdict(Lock)  # MAP FROM PATH TO IN-PROCESS Lock, WHEN NOT _use_ofd
+
+MIN_POLL = 0.001
+MAX_POLL = 0.05
+
+
+class FileLock:
+    """
+    CROSS-PROCESS LOCK ON path, OR length BYTES OF IT STARTING AT offset (length=0 MEANS TO THE END,
+    AND BEYOND). USE whence=os.SEEK_END TO LOCK FROM THE CURRENT END OF FILE, FOR APPENDING
+    """
+
+    def __init__(self, path, exclusive=True, timeout=None, offset=0, length=0, whence=os.SEEK_SET):
+        """
+        :param exclusive: False FOR A SHARED (READ) LOCK
+        :param timeout: SECONDS TO WAIT BEFORE RAISING AN ERROR (None WAITS FOREVER)
+        """
+        self.path = path
+        self.exclusive = exclusive
+        self.timeout = timeout
+        self.offset = offset
+        self.length = length
+        self.whence = whence
+        self.fd = None
+        self.thread_lock = None
+
+    @property
+    def locked(self):
+        return self.fd is not None
+
+    def acquire(self):
+        if not fcntl:
+            logger.error("File locks require fcntl, which is not available on this platform")
+        if self.fd is not None:
+            logger.error("Lock on {path} is already held", path=self.path)
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+
+        if not _use_ofd:
+            with _thread_locks_lock:
+                thread_lock = _thread_locks[os.path.abspath(self.path)]
+            if not thread_lock.acquire(timeout=-1 if deadline is None else max(0, deadline - time.monotonic())):
+                logger.error("Timeout waiting for lock on {path}", path=self.path)
+            self.thread_lock = thread_lock
+
+        try:
+            fd = _open(self.path, self.exclusive)
+            try:
+                if deadline is None:
+                    self._lock(fd, blocking=True)
+                else:
+                    poll = MIN_POLL
+                    while not self._lock(fd, blocking=False):
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            logger.error("Timeout waiting for lock on {path}", path=self.path)
+                        time.sleep(min(poll, remaining))
+                        poll = min(poll * 2, MAX_POLL)
+            except BaseException:
+                os.close(fd)
+                raise
+            self.fd = fd
+        except BaseException:
+            self._release_thread_lock()
+            raise
+        return self
+
+    def release(self):
+        if self.fd is None:
+            return
+        fd, self.fd = self.fd, None
+        try:
+            # WHOLE FILE: A RANGE FROM SEEK_END HAS MOVED IF WE APPENDED
+            if _use_ofd:
+                fcntl.fcntl(fd, fcntl.F_OFD_SETLK, _flock.pack(fcntl.F_UNLCK, os.SEEK_SET, 0, 0, 0))
+            else:
+                fcntl.lockf(fd, fcntl.LOCK_UN, 0, 0, os.SEEK_SET)
+        finally:
+            os.close(fd)
+            self._release_thread_lock()
+
+    def _lock(self, fd, blocking):
+        """
+        :return: True IF LOCKED, False IF SOMEONE ELSE HAS IT (ONLY WHEN NOT blocking)
+        """
+        try:
+            if _use_ofd:
+                command = fcntl.F_OFD_SETLKW if blocking else fcntl.F_OFD_SETLK
+                type_ = fcntl.F_WRLCK if self.exclusive else fcntl.F_RDLCK
+                fcntl.fcntl(fd, command, _flock.pack(type_, self.whence, self.offset, self.length, 0))
+            else:
+                command = fcntl.LOCK_EX if self.exclusive else fcntl.LOCK_SH
+                if not blocking:
+                    command |= fcntl.LOCK_NB
+                fcntl.lockf(fd, command, self.length, self.offset, self.whence)
+            return True
+        except (BlockingIOError, PermissionError):
+            if blocking:
+                raise
+            return False
+
+    def _release_thread_lock(self):
+        if self.thread_lock:
+            thread_lock, self.thread_lock = self.thread_lock, None
+            thread_lock.release()
+
+    def __enter__(self):
+        return self.acquire()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.release()
+
+
+def _open(path, exclusive):
+    # A WRITE LOCK NEEDS A WRITABLE DESCRIPTOR; A READ LOCK CAN MAKE DO WITH READ-ONLY
+    try:
+        return os.open(path, os.O_RDWR | os.O_CREAT, 0o666)
+    except PermissionError:
+        if exclusive:
+            raise
+        return os.open(path, os.O_RDONLY)
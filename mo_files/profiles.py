@@ -0,0 +1,103 @@
+# encoding: utf-8
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at https://www.mozilla.org/en-US/MPL/2.0/.
+#
+# Contact: Kyle Lahnakoski (kyle@lahnakoski.com)
+#
+"""
+HOW A File IS READ
+
+    File("big.tab", profile=SCAN)
+
+SCAN IS FOR BIG ONE-PASS READS: LARGE BUFFERS, THE KERNEL IS TOLD TO READ AHEAD, AND THE PAGES
+ARE DROPPED FROM THE PAGE CACHE WHEN DONE SO THEY DO NOT EVICT THE HOT WORKING SET.
+THE HINTS ARE IGNORED WHERE posix_fadvise IS NOT AVAILABLE
+"""
+import os
+
+has_fadvise = hasattr(os, "posix_fadvise")
+
+
+class IOProfile:
+    __slots__ = ["buffering", "sequential", "readahead", "drop_behind"]
+
+    def __init__(self, buffering=2 ** 14, sequential=False, readahead=0, drop_behind=False):
+        """
+        :param buffering: BYTES READ FROM THE OS AT A TIME
+        :param sequential: TELL THE KERNEL THE FILE IS READ FRONT-TO-BACK (LARGER READ-AHEAD)
+        :param readahead: BYTES AT THE START OF THE FILE TO ASK THE KERNEL TO LOAD NOW
+        :param drop_behind: REMOVE THE FILE FROM THE PAGE CACHE WHEN DONE READING
+        """
+        self.buffering = buffering
+        self.sequential = sequential
+        self.readahead = readahead
+        self.drop_behind = drop_behind
+
+    def replace(self, **kwargs):
+        """
+        :return: COPY WITH SOME SETTINGS CHANGED
+        """
+        settings = {k: getattr(self, k) for k in IOProfile.__slots__}
+        settings.update(kwargs)
+        return IOProfile(**settings)
+
+    def open(self, path):
+        """
+        :return: BINARY FILE OBJECT FOR READING, WITH THE HINTS APPLIED, TO USE IN A with STATEMENT
+        """
+        f = open(path, "rb", buffering=self.buffering)
+        if not has_fadvise:
+            return f
+        try:
+            fd = f.fileno()
+            if self.sequential:
+                os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+            if self.readahead:
+                os.posix_fadvise(fd, 0, self.readahead, os.POSIX_FADV_WILLNEED)
+        except OSError:
+            pass
+        if self.drop_behind:
+            return _DropBehind(f)
+        return f
+
+    def __repr__(self):
+        return "IOProfile(" + ", ".join(f"{k}={getattr(self, k)!r}" for k in IOProfile.__slots__) + ")"
+
+
+class _DropBehind:
+    """
+    FILE OBJECT THAT DROPS ITS PAGES FROM THE PAGE CACHE WHEN CLOSED
+    """
+
+    __slots__ = ["file"]
+
+    def __init__(self, file):
+        self.file = file
+
+    def __enter__(self):
+        return self.file
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __iter__(self):
+        return iter(self.file)
+
+    def __getattr__(self, item):
+        return getattr(self.file, item)
+
+    def close(self):
+        try:
+            os.posix_fadvise(self.file.fileno(), 0, 0, os.POSIX_FADV_DONTNEED)
+        except (OSError, ValueError):
+            pass
+        self.file.close()
+
+
+# WHAT File USES, UNLESS TOLD OTHERWISE
+DEFAULT = IOProfile()
+
+# BIG ONE-PASS READS
+SCAN = IOProfile(buffering=2 ** 20, sequential=True, readahead=2 ** 22, drop_behind=True)
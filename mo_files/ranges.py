@@ -0,0 +1,101 @@
+# encoding: utf-8
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at https://www.mozilla.org/en-US/MPL/2.0/.
+#
+# Contact: Kyle Lahnakoski (kyle@lahnakoski.com)
+#
+import os
+
+# RANGES THIS CLOSE ARE READ AS ONE, THE GAP IS READ AND THROWN AWAY
+DEFAULT_MAX_GAP = 2 ** 12
+
+# WITHOUT pread (WINDOWS) THE fd HAS ONE POSITION, SO READS CAN NOT BE CONCURRENT
+has_pread = hasattr(os, "pread")
+
+
+def read_range(path, offset, length):
+    """
+    :return: UP TO length BYTES STARTING AT offset (FEWER AT END OF FILE)
+    """
+    fd = os.open(path, os.O_RDONLY | getattr(os, "O_BINARY", 0))
+    try:
+        return _pread(fd, offset, length)
+    finally:
+        os.close(fd)
+
+
+def read_ranges(path, ranges, max_gap=DEFAULT_MAX_GAP, concurrent=False):
+    """
+    :param ranges: LIST OF (offset, length)
+    :param max_gap: READ RANGES SEPARATED BY NO MORE THAN THIS AS ONE
+    :param concurrent: True TO ISSUE THE READS ON THE SHARED I/O THREAD POOL
+    :return: LIST OF BYTES, IN THE SAME ORDER AS ranges
+    """
+    ranges = list(ranges)
+    for offset, length in ranges:
+        if offset < 0 or length < 0:
+            raise ValueError(f"expecting non-negative offset and length, not ({offset}, {length})")
+    runs = coalesce(ranges, max_gap)
+
+    fd = os.open(path, os.O_RDONLY | getattr(os, "O_BINARY", 0))
+    try:
+        if concurrent and has_pread and len(runs) > 1:
+            from mo_files import aio
+
+            pool = aio.get_pool()
+            futures = [pool.submit(_pread, fd, start, end - start) for start, end, _ in runs]
+            blocks = [f.result() for f in futures]
+        else:
+            blocks = [_pread(fd, start, end - start) for start, end, _ in runs]
+    finally:
+        os.close(fd)
+
+    output = [None] * len(ranges)
+    for (start, _, members), block in zip(runs, blocks):
+        for i in members:
+            offset, length = ranges[i]
+            output[i] = block[offset - start : offset - start + length]
+    return output
+
+
+def coalesce(ranges, max_gap=DEFAULT_MAX_GAP):
+    """
+    :param ranges: LIST OF (offset, length)
+    :return: LIST OF (start, end, INDEXES INTO ranges) COVERING ALL ranges, IN FILE ORDER
+    """
+    runs = []
+    for i in sorted(range(len(ranges)), key=lambda i: ranges[i][0]):
+        offset, length = ranges[i]
+        end = offset + length
+        if runs and offset <= runs[-1][1] + max_gap:
+            run = runs[-1]
+            run[1] = max(run[1], end)
+            run[2].append(i)
+        else:
+            runs.append([offset, end, [i]])
+    return [tuple(r) for r in runs]
+
+
+def _pread(fd, offset, length):
+    data = _read_at(fd, offset, length)
+    if len(data) == length or not data:
+        return data
+    # SHORT READ: KEEP GOING UNTIL length OR END OF FILE
+    parts = [data]
+    got = len(data)
+    while got < length:
+        data = _read_at(fd, offset + got, length - got)
+        if not data:
+            break
+        parts.append(data)
+        got += len(data)
+    return b"".join(parts)
+
+
+def _read_at(fd, offset, length):
+    if has_pread:
+        return os.pread(fd, length, offset)
+    os.lseek(fd, offset, os.SEEK_SET)
+    return os.read(fd, length)
@@ -0,0 +1,261 @@
+# encoding: utf-8
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at https://www.mozilla.org/en-US/MPL/2.0/.
+#
+# Contact: Kyle Lahnakoski (kyle@lahnakoski.com)
+#
+import atexit
+import heapq
+import os
+import time
+from itertools import count
+from threading import Condition, Lock, Thread
+
+from mo_logs import logger
+
+DEFAULT_WORKERS = 8
+BATCH_SIZE = 256
+
+# HIDDEN DIRECTORY, NEXT TO WHAT IS BEING DELETED, THAT HOLDS IT UNTIL THE reaper IS DONE
+# (SAME FILESYSTEM, SO THE MOVE IS A RENAME). File TRAVERSAL DOES NOT LOOK INSIDE
+TRASH = ".mo-files-trash"
+
+
+class Progress:
+    """
+    COUNTS OF WHAT WAS DELETED, AND WHAT COULD NOT BE
+    """
+
+    def __init__(self):
+        self.lock = Lock()
+        self.files = 0
+        self.directories = 0
+        self.errors = []  # LIST OF (path, exception)
+
+    def deleted(self, files=0, directories=0):
+        with self.lock:
+            self.files += files
+            self.directories += directories
+
+    def error(self, path, cause):
+        with self.lock:
+            self.errors.append((path, cause))
+
+
+def remove_path(path, progress=None, pool=None):
+    """
+    DELETE FILE OR DIRECTORY TREE, IF IT EXISTS
+    :param pool: SEE remove_tree()
+    """
+    progress = progress or Progress()
+    if os.path.isdir(path) and not os.path.islink(path):
+        remove_tree(path, progress=progress, pool=pool)
+    elif os.path.lexists(path):
+        os.remove(path)
+        progress.deleted(files=1)
+    parent = os.path.dirname(path)
+    if os.path.basename(parent) == TRASH:
+        try:
+            os.rmdir(parent)
+        except OSError:
+            # STILL HOLDING OTHER DELETES
+            pass
+
+
+def remove_tree(path, workers=DEFAULT_WORKERS, progress=None, pool=None):
+    """
+    DELETE DIRECTORY TREE: ONE THREAD WALKS IT WITH scandir, workers THREADS UNLINK THE FILES
+    ONE BATCH OF FILES IS LEFT FOR THE CALLING THREAD, SO A SMALL TREE NEEDS NO THREADS AT ALL
+    :param pool: function() RETURNING A SHARED Executor (DEFAULT IS A PRIVATE POOL OF workers THREADS)
+    """
+    progress = progress or Progress()
+    num_errors = len(progress.errors)
+    directories = []
+    held = None
+    executor = None
+    futures = []
+
+    def submit(batch):
+        nonlocal held, executor
+        if held is None:
+            held = batch
+            return
+        if executor is None:
+            if pool:
+                executor = pool()
+            else:
+                from concurrent.futures import ThreadPoolExecutor
+
+                executor = ThreadPoolExecutor(workers, thread_name_prefix="mo-files delete")
+        futures.append(_submit(executor, batch, progress))
+
+    try:
+        todo = [path]
+        batch = []
+        while todo:
+            directory = todo.pop()
+            directories.append(directory)
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False):
+                            todo.append(entry.path)
+                            continue
+                        batch.append(entry.path)
+                        if len(batch) >= BATCH_SIZE:
+                            submit(batch)
+                            batch = []
+            except Exception as cause:
+                progress.error(directory, cause)
+        _unlink_all(batch, progress)
+        if held:
+            _unlink_all(held, progress)
+    finally:
+        for future in futures:
+            if future:
+                future.result()
+        if executor and not pool:
+            executor.shutdown()
+
+    # DEEPEST FIRST
+    for directory in reversed(directories):
+        try:
+            os.rmdir(directory)
+            progress.deleted(directories=1)
+        except Exception as cause:
+            progress.error(directory, cause)
+
+    errors = progress.errors[num_errors:]
+    if errors:
+        path, cause = errors[0]
+        raise Exception(f"could not delete {len(errors)} items, including {path}") from cause
+
+
+def _submit(pool, paths, progress):
+    """
+    :return: Future, OR None IF DONE HERE
+    """
+    try:
+        return pool.submit(_unlink_all, paths, progress)
+    except RuntimeError:
+        # NO NEW THREADS AFTER INTERPRETER SHUTDOWN (Reaper.flush() IS CALLED atexit)
+        _unlink_all(paths, progress)
+
+
+def _unlink_all(paths, progress):
+    deleted = 0
+    for path in paths:
+        try:
+            os.unlink(path)
+            deleted += 1
+        except FileNotFoundError:
+            pass
+        except Exception as cause:
+            progress.error(path, cause)
+    progress.deleted(files=deleted)
+
+
+class Reaper:
+    """
+    ONE BACKGROUND THREAD THAT DELETES FILES AND DIRECTORIES
+    FAILED DELETES (EG WINDOWS STILL HOLDING THE FILE) ARE RETRIED WITH EXPONENTIAL BACKOFF
+    WHATEVER IS LEFT IS ATTEMPTED ONE LAST TIME AT INTERPRETER EXIT
+    """
+
+    def __init__(self, remove=None, retry_delay=1, max_delay=60, max_attempts=10):
+        self.progress = Progress()
+        self.remove = remove or (lambda path: remove_path(path, self.progress, self._pool))
+        self.retry_delay = retry_delay
+        self.max_delay = max_delay
+        self.max_attempts = max_attempts
+        self.lock = Condition()
+        # HEAP OF (due, sequence, path, attempts)
+        self.queue = []
+        self.sequence = count()
+        self.working = 0
+        self.deleted = 0
+        self.failed = 0
+        self.thread = None
+        self.pool = None
+
+    @property
+    def pending(self):
+        """
+        NUMBER OF PATHS NOT YET DELETED
+        """
+        return len(self.queue) + self.working
+
+    def delete(self, path):
+        """
+        SCHEDULE path FOR DELETION, RETURNS IMMEDIATELY
+        """
+        with self.lock:
+            heapq.heappush(self.queue, (0, next(self.sequence), path, 0))
+            if not self.thread:
+                self.thread = Thread(target=self._worker, name="mo-files reaper", daemon=True)
+                self.thread.start()
+                atexit.register(self.flush)
+            self.lock.notify()
+
+    def flush(self):
+        """
+        ATTEMPT EVERYTHING PENDING NOW, IN THIS THREAD, ONE LAST TIME
+        """
+        with self.lock:
+            batch, self.queue = self.queue, []
+            self.working += len(batch)
+        for _, _, path, _ in batch:
+            self._attempt(path, self.max_attempts - 1)
+
+    def _pool(self):
+        """
+        THREADS FOR UNLINKING BIG TREES, MADE ONCE, ON FIRST NEED
+        """
+        with self.lock:
+            if not self.pool:
+                from concurrent.futures import ThreadPoolExecutor
+
+                self.pool = ThreadPoolExecutor(DEFAULT_WORKERS, thread_name_prefix="mo-files delete")
+            return self.pool
+
+    def _worker(self):
+        while True:
+            with self.lock:
+                while True:
+                    now = time.monotonic()
+                    if not self.queue:
+                        self.lock.wait()
+                    elif self.queue[0][0] > now:
+                        self.lock.wait(self.queue[0][0] - now)
+                    else:
+                        break
+                # TAKE EVERYTHING THAT IS DUE
+                batch = []
+                while self.queue and self.queue[0][0] <= now:
+                    batch.append(heapq.heappop(self.queue))
+                self.working += len(batch)
+            for _, _, path, attempts in batch:
+                self._attempt(path, attempts)
+
+    def _attempt(self, path, attempts):
+        try:
+            self.remove(path)
+            with self.lock:
+                self.working -= 1
+                self.deleted += 1
+        except Exception as cause:
+            attempts += 1
+            with self.lock:
+                self.working -= 1
+                if attempts < self.max_attempts:
+                    delay = min(self.max_delay, self.retry_delay * 2 ** (attempts - 1))
+                    heapq.heappush(self.queue, (time.monotonic() + delay, next(self.sequence), path, attempts))
+                    return
+                self.failed += 1
+            logger.warning("problem deleting {path}", path=path, cause=cause)
+
+
+# SHARED BY ALL TempFile AND TempDirectory
+reaper = Reaper()
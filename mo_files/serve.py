@@ -0,0 +1,205 @@
+# encoding: utf-8
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at https://www.mozilla.org/en-US/MPL/2.0/.
+#
+# Contact: Kyle Lahnakoski (kyle@lahnakoski.com)
+#
+"""
+SERVE A File OVER HTTP, WITHOUT LOADING IT INTO MEMORY
+
+    response = serve.prepare(File("static/app.js"), request_headers)
+    response.send(sock)             # STATUS LINE, HEADERS, AND BODY WITH os.sendfile
+    ...
+    for chunk in response.chunks(): # OR STREAM THE BODY YOURSELF (WSGI, ASGI)
+
+ETag AND Last-Modified COME FROM ONE stat; A SINGLE BYTE RANGE IS SUPPORTED; A NEWER ".gz"
+SIBLING IS SENT INSTEAD WHEN THE CLIENT ACCEPTS gzip
+"""
+import os
+import re
+from email.utils import formatdate, parsedate_to_datetime
+from stat import S_ISREG
+
+DEFAULT_BLOCK_SIZE = 2 ** 16
+
+REASONS = {
+    200: "OK",
+    206: "Partial Content",
+    304: "Not Modified",
+    404: "Not Found",
+    416: "Range Not Satisfiable",
+}
+
+_range = re.compile(r"^\s*bytes\s*=\s*(\d*)\s*-\s*(\d*)\s*$")
+
+
+class Response:
+    def __init__(self, status, headers, path=None, offset=0, length=0):
+        self.status = status
+        self.headers = headers  # LIST OF (name, value)
+        self.path = path  # OS PATH OF THE BODY, None IF NO BODY
+        self.offset = offset
+        self.length = length
+
+    @property
+    def reason(self):
+        return REASONS.get(self.status, "")
+
+    def head(self):
+        """
+        :return: BYTES OF THE STATUS LINE AND HEADERS
+        """
+        lines = [f"HTTP/1.1 {self.status} {self.reason}"]
+        lines.extend(f"{k}: {v}" for k, v in self.headers)
+        return ("\r\n".join(lines) + "\r\n\r\n").encode("latin1")
+
+    def chunks(self, block_size=DEFAULT_BLOCK_SIZE):
+        """
+        :return: GENERATOR OF THE BODY, block_size BYTES AT A TIME
+        """
+        if not self.path:
+            return
+        remaining = self.length
+        with open(self.path, "rb") as f:
+            f.seek(self.offset)
+            while remaining > 0:
+                block = f.read(min(block_size, remaining))
+                if not block:
+                    break
+                remaining -= len(block)
+                yield block
+
+    def send(self, sock, body=True):
+        """
+        WRITE THE WHOLE RESPONSE TO sock (USE body=False FOR HEAD REQUESTS)
+        socket.sendfile() USES os.sendfile WHERE IT CAN, SO THE BODY NEVER ENTERS PYTHON
+        """
+        sock.sendall(self.head())
+        if not body or not self.path or not self.length:
+            return
+        with open(self.path, "rb") as f:
+            sock.sendfile(f, self.offset, self.length)
+
+
+def prepare(file, request_headers=None, gzip=True):
+    """
+    :param file: File TO SERVE
+    :param request_headers: MAP FROM HEADER NAME TO VALUE
+    :param gzip: True TO SEND A NEWER "{file}.gz" WHEN THE CLIENT ACCEPTS IT
+    :return: Response
+    """
+    request_headers = {k.lower(): v for k, v in (request_headers or {}).items()}
+    path = file.os_path
+    try:
+        stat = os.stat(path)
+    except (FileNotFoundError, NotADirectoryError):
+        return Response(404, [("Content-Length", "0")])
+    if not S_ISREG(stat.st_mode):
+        return Response(404, [("Content-Length", "0")])
+
+    headers = [("Content-Type", file.mime_type)]
+    if gzip:
+        headers.append(("Vary", "Accept-Encoding"))
+        if _accepts_gzip(request_headers.get("accept-encoding")):
+            try:
+                gz_stat = os.stat(path + ".gz")
+                if S_ISREG(gz_stat.st_mode) and gz_stat.st_mtime_ns >= stat.st_mtime_ns:
+                    path, stat = path + ".gz", gz_stat
+                    headers.append(("Content-Encoding", "gzip"))
+            except FileNotFoundError:
+                pass
+
+    size = stat.st_size
+    etag = f'"{size:x}-{stat.st_mtime_ns:x}"'
+    headers.append(("ETag", etag))
+    headers.append(("Last-Modified", formatdate(stat.st_mtime, usegmt=True)))
+    headers.append(("Accept-Ranges", "bytes"))
+
+    if _not_modified(request_headers, etag, stat.st_mtime):
+        return Response(304, headers)
+
+    range_ = request_headers.get("range")
+    if_range = request_headers.get("if-range")
+    if range_ and (not if_range or if_range == etag):
+        bounds = _parse_range(range_, size)
+        if bounds is False:
+            return Response(416, headers + [("Content-Range", f"bytes */{size}"), ("Content-Length", "0")])
+        if bounds:
+            start, end = bounds
+            length = end - start + 1
+            headers.append(("Content-Range", f"bytes {start}-{end}/{size}"))
+            headers.append(("Content-Length", str(length)))
+            return Response(206, headers, path, start, length)
+
+    headers.append(("Content-Length", str(size)))
+    return Response(200, headers, path, 0, size)
+
+
+def _accepts_gzip(accept_encoding):
+    """
+    :return: True IF gzip HAS A NON-ZERO q, EXPLICITLY OR BY "*" (AN EXPLICIT gzip WINS)
+    """
+    if not accept_encoding:
+        return False
+    wildcard = None
+    for coding in accept_encoding.split(","):
+        name, *params = coding.split(";")
+        name = name.strip().lower()
+        if name not in ("gzip", "*"):
+            continue
+        q = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    q = float(value.strip())
+                except ValueError:
+                    # MALFORMED, SO IGNORE IT
+                    q = 1.0
+        if name == "gzip":
+            return q > 0
+        if wildcard is None:
+            wildcard = q > 0
+    return bool(wildcard)
+
+
+def _not_modified(request_headers, etag, mtime):
+    if_none_match = request_headers.get("if-none-match")
+    if if_none_match:
+        tags = [t.strip() for t in if_none_match.split(",")]
+        # WEAK COMPARISON
+        return "*" in tags or etag in tags or f"W/{etag}" in tags
+    if_modified_since = request_headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except Exception:
+            return False
+    return False
+
+
+def _parse_range(value, size):
+    """
+    :return: (start, end) INCLUSIVE, None TO IGNORE THE RANGE, False IF IT CAN NOT BE SATISFIED
+    """
+    match = _range.match(value)
+    if not match:
+        # MULTIPLE RANGES, OR OTHER UNITS: SEND THE WHOLE FILE
+        return None
+    start, end = match.groups()
+    if not start:
+        if not end:
+            return None
+        suffix = int(end)
+        if not suffix:
+            return False
+        return max(0, size - suffix), size - 1
+    start = int(start)
+    if start >= size:
+        return False
+    end = min(int(end), size - 1) if end else size - 1
+    if end < start:
+        return None
+    return start, end
@@ -6,8 +6,12 @@
 #
 # Contact: Kyle Lahnakoski (kyle@lahnakoski.com)
 #
+from functools import lru_cache
+from itertools import islice
+
 from mo_dots import (
     Data,
+    from_data,
     Null,
     coalesce,
     is_data,
@@ -28,6 +32,8 @@ class URL:
     [1] https://docs.python.org/3/library/urllib.parse.html
     """
 
+    __slots__ = ["scheme", "host", "port", "path", "_query", "_shared", "_exposed", "fragment"]
+
     def __new__(cls, value, *args, **kwargs):
         if isinstance(value, URL):
             return value
@@ -50,28 +56,48 @@ class URL:
 
             if value.startswith("file://") or value.startswith("//"):
                 # urlparse DOES NOT WORK IN THESE CASES
-                scheme, suffix = value.split("//", 1)
-                self.scheme = scheme.rstrip(":")
-                parse(self, suffix, 0, 1)
-                self.query = to_data(url_param2value(self.query))
+                start = value.find("//")
+                self.scheme = value[:start].rstrip(":")
+                parse(self, value, start + 2)
+                self._query = to_data(url_param2value(self._query))
+                self._exposed = False
             else:
                 output = urlparse(value)
                 self.scheme = output.scheme
                 self.port = coalesce(port, output.port)
                 self.host = output.netloc.split(":")[0]
                 self.path = coalesce(path, output.path)
-                self.query = coalesce(query, to_data(url_param2value(output.query)))
+                if query is None:
+                    self._query = to_data(url_param2value(output.query))
+                    self._exposed = False
                 self.fragment = coalesce(fragment, output.fragment)
         except Exception as e:
             Log.error("problem parsing {value} to URL", value=value, cause=e)
 
+    @property
+    def query(self):
+        if self._shared:
+            # COPY-ON-WRITE: THE CALLER MAY CHANGE WHAT IS SHARED WITH ANOTHER URL
+            self._shared = False
+            if self._query is not None:
+                self._query = Data(**self._query)
+        # THE CALLER HAS IT NOW, SO IT CAN NOT BE SHARED WITH COPIES
+        self._exposed = True
+        return self._query
+
+    @query.setter
+    def query(self, value):
+        self._query = value
+        self._shared = False
+        self._exposed = True
+
     def __nonzero__(self):
-        if self.scheme or self.host or self.port or self.path or self.query or self.fragment:
+        if self.scheme or self.host or self.port or self.path or self._query or self.fragment:
             return True
         return False
 
     def __bool__(self):
-        if self.scheme or self.host or self.port or self.path or self.query or self.fragment:
+        if self.scheme or self.host or self.port or self.path or self._query or self.fragment:
             return True
         return False
 
@@ -143,10 +169,44 @@ class URL:
         output.host = self.host
         output.port = self.port
         output.path = self.path
-        output.query = Data(**self.query)
         output.fragment = self.fragment
+        if self._exposed and self._query is not None:
+            # SOMEONE HOLDS OUR query, AND MAY STILL CHANGE IT
+            output._query = Data(**self._query)
+            output._shared = output._exposed = False
+        else:
+            # BOTH SHARE THE query UNTIL ONE OF THEM ASKS FOR IT
+            output._query = self._query
+            output._shared = self._shared = True
+            output._exposed = False
         return output
 
+    def __reduce__(self):
+        # Data IS NOT PICKLABLE, SO SEND THE PLAIN PARTS
+        return _from_parts, tuple(from_data(v) for v in (self.scheme, self.host, self.port, self.path, self._query, self.fragment))
+
+    @classmethod
+    def parse_many(cls, values, processes=None, chunk_size=10_000):
+        """
+        PARSE MANY URL STRINGS, IN ORDER
+        :param values: ITERABLE OF STRINGS
+        :param processes: NUMBER OF WORKER PROCESSES TO FAN OUT TO (DEFAULT IS IN-PROCESS)
+        :param chunk_size: NUMBER OF URLS SENT TO A WORKER AT A TIME
+        :return: GENERATOR OF URL
+        """
+        return _many(_parse_chunk, values, processes, chunk_size)
+
+    @classmethod
+    def format_many(cls, urls, processes=None, chunk_size=10_000):
+        """
+        SERIALIZE MANY URLS, IN ORDER
+        :param urls: ITERABLE OF URL
+        :param processes: NUMBER OF WORKER PROCESSES TO FAN OUT TO (DEFAULT IS IN-PROCESS)
+        :param chunk_size: NUMBER OF URLS SENT TO A WORKER AT A TIME
+        :return: GENERATOR OF STRINGS
+        """
+        return _many(_format_chunk, urls, processes, chunk_size)
+
     def decode(self, encoding=""):
         return str(self).decode(encoding)
 
@@ -173,13 +233,53 @@ class URL:
                 url += "/" + path
             else:
                 url += path
-        if len(self.query):
-            url = url + "?" + value2url_param(self.query)
+        if len(self._query):
+            url = url + "?" + value2url_param(self._query)
         if self.fragment:
             url = url + "#" + value2url_param(self.fragment)
         return url
 
 
+def _from_parts(scheme, host, port, path, query, fragment):
+    output = URL(None, port=port, path=path, query=to_data(query), fragment=to_data(fragment))
+    output.scheme = scheme
+    output.host = host
+    return output
+
+
+def _parse_chunk(values):
+    # LOGS REPEAT THE SAME URL OFTEN, PARSE EACH ONLY ONCE
+    seen = {}
+    output = []
+    for value in values:
+        url = seen.get(value)
+        if url is None:
+            seen[value] = url = URL(value)
+            output.append(url)
+        else:
+            output.append(url.__copy__())
+    return output
+
+
+def _format_chunk(urls):
+    return [str(url) for url in urls]
+
+
+def _many(func, values, processes, chunk_size):
+    values = iter(values)
+    chunks = iter(lambda: list(islice(values, chunk_size)), [])
+    if processes and processes > 1:
+        from multiprocessing import get_context
+
+        # spawn, BECAUSE A FORKED CHILD CAN INHERIT LOCKS HELD BY OUR OTHER THREADS
+        with get_context("spawn").Pool(processes) as pool:
+            for chunk in pool.imap(func, chunks):
+                yield from chunk
+    else:
+        for chunk in chunks:
+            yield from func(chunk)
+
+
 def int2hex(value, size):
     return (("0" * size) + hex(value)[2:])[-size:]
 
@@ -199,21 +299,27 @@ for i in range(128, 256):
 _map2url[32] = "+"
 
 
-names = ["path", "query", "fragment"]
-indicator = ["/", "?", "#"]
-
-
-def parse(output, suffix, curr, next):
-    if next == len(indicator):
-        output.__setattr__(names[curr], suffix)
-        return
-
-    e = suffix.find(indicator[next])
-    if e == -1:
-        parse(output, suffix, curr, next + 1)
+def parse(output, value, start):
+    """
+    SET path, query AND fragment FROM value[start:], WITHOUT COPYING THE REST AT EACH STEP
+    query AND fragment ARE ONLY SET IF FOUND
+    """
+    q = value.find("?", start)
+    if q == -1:
+        f = value.find("#", start)
+        if f == -1:
+            output.path = value[start:]
+        else:
+            output.path = value[start:f]
+            output.fragment = value[f + 1 :]
     else:
-        output.__setattr__(names[curr], suffix[:e:])
-        parse(output, suffix[e + 1 : :], next, next + 1)
+        output.path = value[start:q]
+        f = value.find("#", q + 1)
+        if f == -1:
+            output.query = value[q + 1 :]
+        else:
+            output.query = value[q + 1 : f]
+            output.fragment = value[f + 1 :]
 
 
 def hex2byte(v):
@@ -306,10 +412,11 @@ def url_param2value(param):
                 output = output[:-utf_remaining] + [v[start:].encode("latin1")]
 
             output = b"".join(output).decode("utf8")
-            try:
-                output = json2value(output)
-            except Exception:
-                pass
+            if maybe_json(output):
+                try:
+                    output = json2value(output)
+                except Exception:
+                    pass
             results.append(output)
         return unwraplist(results)
 
@@ -343,31 +450,60 @@ def from_paths(value):
     :param value:
     :return:
     """
-    output = Data()
+    output = {}
     for k, v in value.items():
-        path = k.split("[")
-        if any(not p.endswith("]") for p in path[1:]):
-            Log.error("expecting square brackets to be paired")
-        path = [
-            int(pp) if is_integer(pp) else pp for i, p in enumerate(path) for pp in [p.rstrip("]") if i > 0 else p]
-        ]
-
+        path = key_path(k)
         d = output
-        for p, q in zip(path, path[1:]):
-            if is_null(d[p]):
-                if is_text(q):
-                    d[p] = {}
-                else:
-                    d[p] = []
-            elif is_text(q) == is_list(d[p]):
+        for i in range(len(path) - 1):
+            p, q = path[i], path[i + 1]
+            child = _get_step(d, p)
+            if child is None:
+                child = {} if is_text(q) else []
+                _set_step(d, p, child)
+            elif not isinstance(child, list if isinstance(q, int) else dict):
                 Log.error(
-                    "can not index {type} with {key}", type=type(d[p]).__name__, key=q,
+                    "can not index {type} with {key}", type=type(child).__name__, key=q,
                 )
+            d = child
+        _set_step(d, path[-1], from_data(v))
 
-            d = d[p]
-        d[path[-1]] = v
+    return to_data(output)
+
+
+@lru_cache(maxsize=2 ** 14)
+def key_path(key):
+    """
+    SPLIT SQUARE BRACKET KEY INTO ITS STEPS
+    EXAMPLE: columns[1][name] -> ("columns", 1, "name")
+    """
+    path = key.split("[")
+    if any(not p.endswith("]") for p in path[1:]):
+        Log.error("expecting square brackets to be paired")
+    return tuple(_step(p.rstrip("]") if i else p) for i, p in enumerate(path))
+
+
+def _step(step):
+    try:
+        return int(step)
+    except ValueError:
+        return step
+
+
+def _get_step(d, step):
+    if isinstance(d, list):
+        return d[step] if 0 <= step < len(d) else None
+    return d.get(step)
 
-    return output
+
+def _set_step(d, step, value):
+    if isinstance(d, list):
+        if step >= len(d):
+            d.extend([None] * (step + 1 - len(d)))
+        d[step] = value
+    elif value is None:
+        d.pop(step, None)
+    else:
+        d[step] = value
 
 
 def value2url_param(value):
@@ -392,12 +528,15 @@ def value2url_param(value):
             if vv or vv == 0
         )
     elif is_text(value):
-        try:
-            # IF STRING LOOKS LIKE JSON, THEN IT IS AMBIGUOUS, ENCODE IT
-            json2value(value)
-            output = _encode(value2json(value))
-        except Exception:
+        if not maybe_json(value):
             output = _encode(value)
+        else:
+            try:
+                # IF STRING LOOKS LIKE JSON, THEN IT IS AMBIGUOUS, ENCODE IT
+                json2value(value)
+                output = _encode(value2json(value))
+            except Exception:
+                output = _encode(value)
     elif is_binary(value):
         output = "".join(_map2url[c] for c in value)
     elif is_many(value):
@@ -410,6 +549,18 @@ def value2url_param(value):
     return output
 
 
+_json_starts = set('{["-0123456789')
+_json_words = {"true", "false", "null", "NaN", "Infinity"}
+
+
+def maybe_json(value):
+    """
+    CHEAP TEST TO AVOID THE (EXPENSIVE) FAILED PARSE OF A STRING THAT CAN NOT BE JSON
+    """
+    value = value.strip(" \t\n\r")
+    return value[:1] in _json_starts or value in _json_words
+
+
 def is_integer(s):
     if s is True or s is False:
         return False
@@ -1,70 +1,320 @@
-import codecs
-import io
-from mo_logs import Log
-from mo_times.timer import Timer
-
-
-def test_simple(filename):
-    with Timer("simple time"):
-        with codecs.open(filename, "r", encoding="utf-8") as f:
-            for line in f:
-                id = int(line.split("\t")[0])
-                if id % 10000 == 0:
-                    Log.note("{id}", id=id)
-
-
-def test_buffered(filename):
-    with Timer("buffered time"):
-        with codecs.open(filename, "r", encoding="utf-8", buffering=2 ** 25) as f:
-            for line in f:
-                id = int(line.split("\t")[0])
-                if id % 10000 == 0:
-                    Log.note("{id}", id=id)
-
-
-def test_io(filename):
-    with Timer("io time"):
-        with io.open(filename, "r", buffering=2 ** 25) as f:
-            for line in f:
-                line = line.decode("utf-8")
-                id = int(line.split("\t")[0])
-                if id % 10000 == 0:
-                    Log.note("{id}", id=id)
-
-
-def test_binary(filename, buffering=2 ** 14):
-    with Timer("binary time (buffering=={buffering})", {"buffering": buffering}):
-        remainder = ""
-        with io.open(filename, "rb") as f:
-            while True:
-                block = f.read(buffering)
-                if block == "":
-                    if remainder == "":
-                        return None
-                    return remainder
-                lines = (remainder + block).split("\n")
-                for line in lines[:-1]:
-                    line = line.decode("utf-8")
-                    id = int(line.split("\t")[0])
-                    if id % 10000 == 0:
-                        Log.note("{id}", id=id)
-                remainder = lines[-1]
-
-
-def test_simple_binary(filename):
-    with Timer("simple binary time"):
-        with io.open(filename, "rb") as f:
-            for line in f:
-                line = line.decode("utf-8")
-                id = int(line.split("\t")[0])
-                if id % 10000 == 0:
-                    Log.note("{id}", id=id)
-
-
-test_file = "C:/Users/klahnakoski/git/Datazilla2ElasticSearch/results/recent_old.tab"
-test_simple_binary(test_file)
-test_binary(test_file, 2 ** 14)
-test_binary(test_file, 2 ** 25)
-test_io(test_file)
-test_simple(test_file)
-test_buffered(test_file)
+# encoding: utf-8
+#
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at https://www.mozilla.org/en-US/MPL/2.0/.
+#
+# Author: Kyle Lahnakoski (kyle@lahnakoski.com)
+#
+"""
+BENCHMARKS OVER SYNTHETIC DATA, ONE JSON RECORD PER BENCHMARK
+
+    python tests/speedtest_file.py --size small --output results.jsonl
+
+THE CHECKOUT THIS FILE IS IN IS MEASURED, INSTALLED OR NOT
+THE import BENCHMARK IS THE TIME TO import mo_files IN A FRESH INTERPRETER
+EACH RECORD HAS THE BEST AND MEDIAN SECONDS OVER --repeat RUNS, THE THROUGHPUT, AND THE PEAK
+PYTHON MEMORY (tracemalloc) OF ONE EXTRA RUN, SO RESULTS CAN BE COMPARED ACROSS RELEASES
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tracemalloc
+from datetime import datetime, timezone
+from time import perf_counter
+
+# RUN FROM A CHECKOUT WITHOUT INSTALLING
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from mo_files import File, TempDirectory, URL
+from mo_files.url import from_paths, url_param2value, value2url_param
+
+SIZES = {
+    # lines, line length, tree fan-out, tree depth, number of paths/urls
+    "small": {"lines": 20_000, "width": 80, "fanout": 4, "depth": 3, "items": 2_000},
+    "large": {"lines": 1_000_000, "width": 100, "fanout": 8, "depth": 4, "items": 100_000},
+}
+
+
+def generate(dir, size, seed):
+    """
+    WRITE THE DATASETS, RETURN WHAT THE BENCHMARKS NEED
+    """
+    rand = random.Random(seed)
+    alphabet = "abcdefghijklmnopqrstuvwxyz0123456789 "
+    lines = [
+        f"{i}\t" + "".join(rand.choice(alphabet) for _ in range(size["width"] - 8)) for i in range(size["lines"])
+    ]
+    text_file = dir / "lines.tab"
+    text_file.write_bytes(("\n".join(lines) + "\n").encode("utf8"))
+    shuffled = lines[:]
+    rand.shuffle(shuffled)
+    shuffled_file = dir / "shuffled.tab"
+    shuffled_file.write_bytes(("\n".join(shuffled) + "\n").encode("utf8"))
+
+    records = [{"id": i, "name": line[-20:], "tags": [line[:5], line[5:10]], "value": i / 7} for i, line in enumerate(lines[: size["lines"] // 10])]
+    json_file = dir / "records.json"
+    json_file.write(json.dumps(records))
+
+    tree = dir / "tree"
+
+    def _make(parent, depth):
+        for i in range(size["fanout"]):
+            if depth:
+                _make(parent / f"d{i}", depth - 1)
+            else:
+                (parent / f"f{i}.txt").write("x")
+
+    _make(tree, size["depth"])
+
+    names = ["".join(rand.choice("abcdefgh") for _ in range(8)) for _ in range(size["items"])]
+    params = [{"q": name, "page": i, "tags": [name[:2], name[2:4]], "f": {"a": i}} for i, name in enumerate(names)]
+    urls = [f"https://example.com/{name}/{i}?q={name}&page={i}#top" for i, name in enumerate(names)]
+    # SQUARE BRACKET FORM FIELDS, 6 PER COLUMN
+    fields = {}
+    for i, name in enumerate(names):
+        fields[f"columns[{i}][name]"] = name
+        fields[f"columns[{i}][type]"] = "string"
+        fields[f"columns[{i}][search][value]"] = name[:3]
+        fields[f"columns[{i}][search][regex]"] = "false"
+        fields[f"columns[{i}][tags][0]"] = name[:2]
+        fields[f"columns[{i}][tags][1]"] = name[2:4]
+    return {
+        "text": text_file,
+        "shuffled": shuffled_file,
+        "lines": lines,
+        "json": json_file,
+        "tree": tree,
+        "names": names,
+        "params": params,
+        "encoded": [value2url_param(p) for p in params],
+        "urls": urls,
+        "fields": fields,
+        "scratch": dir / "scratch",
+    }
+
+
+def benchmarks(data):
+    """
+    MAP FROM NAME TO (function, bytes PROCESSED, items PROCESSED)
+    """
+    text, lines, names = data["text"], data["lines"], data["names"]
+    text_bytes = text.length
+    scratch = data["scratch"]
+    num_files = sum(1 for _ in data["tree"].leaves)
+
+    def read():
+        text.read()
+
+    def read_bytes():
+        text.read_bytes()
+
+    def iterate_lines():
+        for _ in text:
+            pass
+
+    def split_first_column():
+        [int(line.split("\t")[0]) for line in text]
+
+    def read_columns():
+        text.read_columns(columns=[0], types={0: int})
+
+    def write():
+        (scratch / "write.txt").write(lines)
+
+    def append():
+        file = scratch / "append.txt"
+        file.delete()
+        for line in lines[:1000]:
+            file.append(line)
+
+    def extend():
+        file = scratch / "extend.txt"
+        file.delete()
+        file.extend(lines)
+
+    def sort_in_memory():
+        (scratch / "sorted.tab").write_bytes(b"".join(sorted(data["shuffled"].read_bytes().splitlines(keepends=True))))
+
+    def sort_lines():
+        # ABOUT 8 RUNS, SO THE MERGE IS MEASURED TOO
+        data["shuffled"].sort_lines(output=scratch / "sorted.tab", run_size=text_bytes // 8)
+
+    def read_json():
+        data["json"].read_json()
+
+    def descendants():
+        for _ in data["tree"].descendants:
+            pass
+
+    def leaves():
+        for _ in data["tree"].leaves:
+            pass
+
+    def find():
+        for _ in data["tree"].find(r".*\.txt"):
+            pass
+
+    def copy():
+        File.copy(text, scratch / "copy.tab")
+
+    def join_paths():
+        base = File("some/base/directory")
+        for name in names:
+            (base / name / "file.txt").abs_path
+
+    def url_parse():
+        for url in data["urls"]:
+            URL(url)
+
+    def url_format():
+        for url in data["parsed_urls"]:
+            str(url)
+
+    def param_encode():
+        for p in data["params"]:
+            value2url_param(p)
+
+    def param_decode():
+        for p in data["encoded"]:
+            url_param2value(p)
+
+    def parse_paths():
+        from_paths(data["fields"])
+
+    data["parsed_urls"] = [URL(u) for u in data["urls"]]
+    append_bytes = sum(len(line) + 1 for line in lines[:1000])
+    return {
+        "read": (read, text_bytes, len(lines)),
+        "read_bytes": (read_bytes, text_bytes, len(lines)),
+        "iterate_lines": (iterate_lines, text_bytes, len(lines)),
+        "split_first_column": (split_first_column, text_bytes, len(lines)),
+        "read_columns": (read_columns, text_bytes, len(lines)),
+        "write": (write, text_bytes, len(lines)),
+        "append": (append, append_bytes, 1000),
+        "extend": (extend, text_bytes, len(lines)),
+        "sort_in_memory": (sort_in_memory, text_bytes, len(lines)),
+        "sort_lines": (sort_lines, text_bytes, len(lines)),
+        "read_json": (read_json, data["json"].length, None),
+        "descendants": (descendants, None, num_files),
+        "leaves": (leaves, None, num_files),
+        "find": (find, None, num_files),
+        "copy": (copy, text_bytes, 1),
+        "join_paths": (join_paths, None, len(names)),
+        "url_parse": (url_parse, sum(len(u) for u in data["urls"]), len(names)),
+        "url_format": (url_format, None, len(names)),
+        "param_encode": (param_encode, None, len(names)),
+        "param_decode": (param_decode, sum(len(p) for p in data["encoded"]), len(names)),
+        "from_paths": (parse_paths, None, len(data["fields"])),
+    }
+
+
+def measure(function, repeat):
+    function()  # WARM UP
+    timings = []
+    for _ in range(repeat):
+        start = perf_counter()
+        function()
+        timings.append(perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        function()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return timings, peak
+
+
+def measure_import(repeat):
+    """
+    SECONDS TO import mo_files IN A FRESH INTERPRETER, AS REPORTED BY -X importtime
+    """
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(p for p in [ROOT, env.get("PYTHONPATH")] if p)
+    timings = []
+    for i in range(repeat + 1):
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", "import mo_files"], env=env, capture_output=True, text=True, check=True,
+        )
+        line = [l for l in result.stderr.splitlines() if l.endswith("| mo_files")][-1]
+        if i:  # FIRST RUN IS WARM UP
+            timings.append(int(line.split("|")[1]) / 1_000_000)
+    return timings, None
+
+
+def version():
+    try:
+        from importlib.metadata import version
+
+        return version("mo-files")
+    except Exception:
+        pass
+    # NOT INSTALLED, ASK THE CHECKOUT
+    try:
+        with open(os.path.join(ROOT, "packaging", "setuptools.json")) as f:
+            return json.load(f)["version"]
+    except Exception:
+        return None
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description="mo-files benchmarks")
+    parser.add_argument("--size", choices=sorted(SIZES), default="small")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--only", nargs="*", help="names of benchmarks to run")
+    parser.add_argument("--output", help="file to write JSON lines (default stdout)")
+    args = parser.parse_args(args)
+
+    meta = {
+        "version": version(),
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "size": args.size,
+        "repeat": args.repeat,
+        "seed": args.seed,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+    }
+    output = open(args.output, "w") if args.output else sys.stdout
+    try:
+        with TempDirectory() as dir:
+            data = generate(dir, SIZES[args.size], args.seed)
+            todo = {"import": (None, None, 1), **benchmarks(data)}
+            for name, (function, num_bytes, num_items) in todo.items():
+                if args.only and name not in args.only:
+                    continue
+                if function:
+                    timings, peak = measure(function, args.repeat)
+                else:
+                    timings, peak = measure_import(args.repeat)
+                best = min(timings)
+                record = {
+                    "benchmark": name,
+                    "best_seconds": best,
+                    "median_seconds": statistics.median(timings),
+                    "bytes": num_bytes,
+                    "items": num_items,
+                    "mb_per_second": num_bytes / best / 2 ** 20 if num_bytes and best else None,
+                    "items_per_second": num_items / best if num_items and best else None,
+                    "peak_memory": peak,
+                    **meta,
+                }
+                output.write(json.dumps(record) + "\n")
+                output.flush()
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+
+if __name__ == "__main__":
+    main()
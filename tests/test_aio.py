@@ -0,0 +1,55 @@
+# encoding: utf-8
+#
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at https://www.mozilla.org/en-US/MPL/2.0/.
+#
+# Author: Kyle Lahnakoski (kyle@lahnakoski.com)
+#
+import asyncio
+
+from mo_testing.fuzzytestcase import FuzzyTestCase
+
+from mo_files import File, aio
+
+
+class TestAio(FuzzyTestCase):
+    def test_aread(self):
+        result = asyncio.run(File("tests/resources/test-file.txt").aread())
+        self.assertEqual(result, "Hello, World!")
+
+    def test_aread_json(self):
+        result = asyncio.run(File("tests/resources/test-concat2.json").aread_json())
+        self.assertEqual(result, {"a": "hello world"})
+
+    def test_async_lines_match(self):
+        async def collect(file):
+            return [line async for line in file]
+
+        for name in ["test-file0.txt", "test-file1.txt", "test-file2.txt"]:
+            file = File("tests/resources") / name
+            self.assertEqual(asyncio.run(collect(file)), list(file.read_lines()))
+
+    def test_small_blocks(self):
+        file = File("tests/temp/test-aio.txt")
+        lines = [f"line {i}" for i in range(1000)]
+
+        async def go():
+            await file.awrite("")
+            await file.aextend(lines)
+            await file.aappend("last")
+            return [line async for line in file.aread_lines(block_size=7)]
+
+        try:
+            self.assertEqual(asyncio.run(go()), lines + ["last"])
+        finally:
+            file.delete()
+
+    def test_concurrent(self):
+        aio.set_max_workers(2)
+
+        async def go():
+            return await asyncio.gather(*(File("tests/resources/test-file.txt").aread() for _ in range(10)))
+
+        self.assertEqual(asyncio.run(go()), ["Hello, World!"] * 10)
@@ -0,0 +1,110 @@
+# encoding: utf-8
+#
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at https://www.mozilla.org/en-US/MPL/2.0/.
+#
+# Author: Kyle Lahnakoski (kyle@lahnakoski.com)
+#
+import os
+
+from mo_testing.fuzzytestcase import FuzzyTestCase
+
+from mo_files import File
+from mo_files.cache import StatCache, parsed_cache, content_cache
+
+
+class TestCache(FuzzyTestCase):
+    def setUp(self):
+        parsed_cache.clear()
+
+    def test_json_cached(self):
+        file = File("tests/temp/test-cache.json")
+        file.write('{"a": {"$concat": ["hello", "world"], "separator": " "}}')
+        try:
+            first = file.read_json(cache=True)
+            self.assertEqual(first, {"a": "hello world"})
+            self.assertEqual(len(parsed_cache), 1)
+
+            # CHANGES TO RESULT DO NOT LEAK INTO CACHE
+            first.a = "changed"
+            self.assertEqual(file.read_json(cache=True), {"a": "hello world"})
+
+            file.write('{"a": "goodbye"}')
+            self.assertEqual(file.read_json(cache=True), {"a": "goodbye"})
+        finally:
+            file.delete()
+
+    def test_ini_cached(self):
+        file = File("tests/temp/test-cache.ini")
+        file.write("[hello]\nworld=world\n")
+        try:
+            self.assertEqual(file.read_ini(cache=True), {"hello": {"world": "world"}})
+            self.assertEqual(file.read_ini(cache=True), {"hello": {"world": "world"}})
+        finally:
+            file.delete()
+        self.assertEqual(len(parsed_cache), 0)
+
+    def test_validated_by_stat(self):
+        file = File("tests/temp/test-stat.json")
+        file.write('{"a": 1}')
+        try:
+            cache = StatCache()
+            self.assertEqual(cache.get(file.os_path, "json", lambda: 1), 1)
+            self.assertEqual(cache.get(file.os_path, "json", lambda: 2), 1)
+
+            # ANOTHER PROCESS CHANGES THE FILE
+            with open(file.os_path, "wb") as f:
+                f.write(b'{"a": 22}')
+            os.utime(file.os_path, ns=(0, 0))
+            self.assertEqual(cache.get(file.os_path, "json", lambda: 3), 3)
+        finally:
+            file.delete()
+
+    def test_eviction(self):
+        files = [File(f"tests/temp/test-evict{i}.txt") for i in range(3)]
+        try:
+            for f in files:
+                f.write("x" * 10)
+            cache = StatCache(max_bytes=25)
+            for i, f in enumerate(files):
+                cache.get(f.os_path, "text", lambda: i)
+            self.assertEqual(len(cache), 2)
+            self.assertEqual(cache.total_bytes, 20)
+            self.assertNotIn(files[0].os_path, cache.entries)
+        finally:
+            for f in files:
+                f.delete()
+
+    def test_content_cached(self):
+        content_cache.clear()
+        file = File("tests/temp/test-content.txt")
+        file.write("hello")
+        try:
+            self.assertEqual(file.read(cache=True), "hello")
+            self.assertEqual(file.read(cache=True), "hello")
+            self.assertEqual(file.read_bytes(cache=True), b"hello")
+            self.assertEqual(content_cache.stats(), {"entries": 1, "bytes": 10, "hits": 1, "misses": 2, "hit_rate": 1 / 3})
+
+            file.write("goodbye")
+            self.assertEqual(len(content_cache), 0)
+            self.assertEqual(file.read_bytes(cache=True), b"goodbye")
+        finally:
+            file.delete()
+        self.assertEqual(len(content_cache), 0)
+
+    def test_large_not_cached(self):
+        file = File("tests/temp/test-large.txt")
+        file.write("x" * 100)
+        try:
+            cache = StatCache(max_bytes=1000, max_item_bytes=50)
+            self.assertEqual(cache.get(file.os_path, "text", lambda: 1), 1)
+            self.assertEqual(cache.get(file.os_path, "text", lambda: 2), 2)
+            self.assertEqual(len(cache), 0)
+        finally:
+            file.delete()
+
+    def test_missing_file(self):
+        with self.assertRaises(Exception):
+            File("tests/temp/does-not-exist.txt").read_bytes(cache=True)
@@ -0,0 +1,111 @@
+# encoding: utf-8
+#
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at https://www.mozilla.org/en-US/MPL/2.0/.
+#
+# Author: Kyle Lahnakoski (kyle@lahnakoski.com)
+#
+from array import array
+from decimal import Decimal
+from unittest import skipIf
+
+from mo_testing.fuzzytestcase import FuzzyTestCase
+
+from mo_files import File
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class TestColumns(FuzzyTestCase):
+    def setUp(self):
+        self.file = File("tests/temp/test-columns.tab")
+        self.rows = [(i, f"name{i}", i / 4) for i in range(1000)]
+        self.file.write("\n".join(f"{a}\t{b}\t{c}" for a, b, c in self.rows))
+
+    def tearDown(self):
+        self.file.delete()
+
+    def test_all_columns(self):
+        result = self.file.read_columns(use_numpy=False)
+        self.assertEqual(sorted(result.keys()), [0, 1, 2])
+        self.assertEqual(result[1][:3], ["name0", "name1", "name2"])
+        self.assertEqual(len(result[2]), 1000)
+
+    def test_projection_and_types(self):
+        result = self.file.read_columns(columns=[2, 0], types={0: int, 2: float}, use_numpy=False)
+        self.assertEqual(list(result.keys()), [2, 0])
+        self.assertIsInstance(result[0], array)
+        self.assertEqual(result[0].typecode, "q")
+        self.assertEqual(list(result[0]), [r[0] for r in self.rows])
+        self.assertEqual(list(result[2]), [r[2] for r in self.rows])
+
+    def test_chunks(self):
+        chunks = list(self.file.iter_columns(columns=[0], types={0: int}, block_size=1000, use_numpy=False))
+        self.assertGreater(len(chunks), 10)
+        self.assertEqual([v for c in chunks for v in c[0]], list(range(1000)))
+
+    def test_header_csv(self):
+        file = File("tests/temp/test-columns.csv")
+        file.write('id,name,score\r\n1,"Smith, John",1.5\r\n2,Jane,2.5\r\n\r\n3,"say ""hi""",3\r\n')
+        try:
+            result = file.read_columns(columns=["name", "id"], types={"id": int}, delimiter=",", header=True, use_numpy=False)
+            self.assertEqual(result["name"], ["Smith, John", "Jane", 'say "hi"'])
+            self.assertEqual(list(result["id"]), [1, 2, 3])
+        finally:
+            file.delete()
+
+    def test_custom_types(self):
+        file = File("tests/temp/test-columns-custom.csv")
+        file.write("id,name,price\n1,x,1.10\n2,y,2.25\n")
+        try:
+            result = file.read_columns(types={"name": lambda s: s.upper(), 2: Decimal, 0: int}, delimiter=",", header=True, use_numpy=False)
+            self.assertEqual(result["name"], ["X", "Y"])
+            self.assertEqual(result["price"], [Decimal("1.10"), Decimal("2.25")])
+            self.assertEqual(list(result["id"]), [1, 2])
+            with self.assertRaises(Exception):
+                file.read_columns(types={"missing": int}, delimiter=",", header=True)
+        finally:
+            file.delete()
+
+    def test_errors(self):
+        with self.assertRaises(Exception):
+            self.file.read_columns(columns=[7])
+        with self.assertRaises(Exception):
+            self.file.read_columns(types={1: int})
+        file = File("tests/temp/test-ragged.tab")
+        file.write("1\t2\n3\n")
+        try:
+            with self.assertRaises(Exception):
+                file.read_columns()
+        finally:
+            file.delete()
+
+    def test_blank_lines(self):
+        file = File("tests/temp/test-blank.tab")
+        try:
+            file.write("1\n\n2\n3\n")
+            self.assertEqual(list(file.read_columns(types={0: int}, use_numpy=False)[0]), [1, 2, 3])
+            self.assertEqual(file.read_columns(use_numpy=False)[0], ["1", "2", "3"])
+            file.write("1\ta\n\n2\tb\n")
+            self.assertEqual(file.read_columns(use_numpy=False), {0: ["1", "2"], 1: ["a", "b"]})
+        finally:
+            file.delete()
+
+    def test_empty(self):
+        file = File("tests/temp/test-empty.tab")
+        file.write("")
+        try:
+            self.assertEqual(file.read_columns(), {})
+        finally:
+            file.delete()
+
+    @skipIf(numpy is None, "requires NumPy")
+    def test_numpy(self):
+        result = self.file.read_columns(columns=[0, 2], types={0: int, 2: float}, use_numpy=True)
+        self.assertIsInstance(result[0], numpy.ndarray)
+        self.assertEqual(result[0].tolist(), [r[0] for r in self.rows])
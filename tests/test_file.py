@@ -1,11 +1,13 @@
 import os
+import subprocess
+import sys
 from unittest import skipIf
 
 from mo_dots import Data, Null
 from mo_testing import FuzzyTestCase
 from mo_times import Date
 
-from mo_files import File, is_windows
+from mo_files import File, is_windows, apply_functions, functions, SCAN, DEFAULT_PROFILE
 
 
 class TestFile(FuzzyTestCase):
@@ -46,6 +48,24 @@ class TestFile(FuzzyTestCase):
         self.assertEqual(result, {"a": "hello world"})
         self.assertIsInstance(result, Data)
 
+    def test_apply_functions_in_place(self):
+        untouched = {"b": [1, 2, 3]}
+        doc = {"a": {"$concat": ["hello", {"$concat": ["wor", "ld"]}], "separator": " "}, "c": untouched}
+        result = apply_functions(doc)
+        self.assertEqual(result, {"a": "hello world", "c": {"b": [1, 2, 3]}})
+        self.assertIs(result, doc)
+        self.assertIs(result["c"], untouched)
+
+    def test_custom_function(self):
+        file = File("tests/temp/test-upper.json")
+        file.write('{"a": {"$upper": "hello"}}')
+        functions["$upper"] = lambda node: node["$upper"].upper()
+        try:
+            self.assertEqual(file.read_json(), {"a": "HELLO"})
+        finally:
+            del functions["$upper"]
+            file.delete()
+
     def test_file_timestamp(self):
         file = File("tests/__init__.py")
         mod_time_epoch = Date(1568322216).unix
@@ -219,3 +239,44 @@ class TestFile(FuzzyTestCase):
     def test_home_dir(self):
         file = File("~")
         self.assertTrue(file.abs_path.startswith("/"))
+
+    def test_lazy_imports(self):
+        code = "import sys, mo_files; print(sorted(m for m in ['asyncio', 'mo_json', 'mimetypes', 'mo_math'] if m in sys.modules))"
+        result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+        self.assertEqual(result.stdout.strip(), "[]")
+
+    def test_io_profile(self):
+        self.assertEqual(File("tests/resources/test-file.txt").profile, DEFAULT_PROFILE)
+        self.assertEqual(File("tests/resources/test-file.txt", buffering=2 ** 20).profile.buffering, 2 ** 20)
+        file = File("tests/resources/test-file.txt", profile=SCAN)
+        self.assertEqual(file.read(), "Hello, World!")
+        self.assertEqual(list(file.read_lines()), ["Hello, World!"])
+        self.assertEqual(list(file), ["Hello, World!"])
+
+    def test_copy_streams(self):
+        source = File("tests/temp/test-copy/source.bin", profile=SCAN.replace(buffering=4096))
+        content = bytes(range(256)) * 1000
+        source.write_bytes(content)
+        try:
+            File.copy(source, "tests/temp/test-copy/deeper/dest.bin")
+            self.assertEqual(File("tests/temp/test-copy/deeper/dest.bin").read_bytes(), content)
+            File.copy("tests/temp/test-copy", "tests/temp/test-copy2")
+            self.assertEqual(File("tests/temp/test-copy2/deeper/dest.bin").read_bytes(), content)
+        finally:
+            File("tests/temp/test-copy").delete()
+            File("tests/temp/test-copy2").delete()
+
+    def test_copy_to_itself(self):
+        file = File("tests/temp/test-copy-self/file.txt")
+        file.write("héllo")
+        try:
+            File.copy(file, file)
+            self.assertEqual(file.read(), "héllo")
+            File.copy("tests/temp/test-copy-self/./file.txt", "tests/temp/test-copy-self/file.txt")
+            self.assertEqual(file.read(), "héllo")
+            if hasattr(os, "link"):
+                os.link(file.os_path, (file.parent / "link.txt").os_path)
+                File.copy(file, file.parent / "link.txt")
+                self.assertEqual(file.read(), "héllo")
+        finally:
+            file.parent.delete()
@@ -0,0 +1,133 @@
+# encoding: utf-8
+#
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at https://www.mozilla.org/en-US/MPL/2.0/.
+#
+# Author: Kyle Lahnakoski (kyle@lahnakoski.com)
+#
+from contextlib import contextmanager
+
+from mo_testing.fuzzytestcase import FuzzyTestCase
+
+from mo_files import File, URL, SpooledTempFile, hooks
+
+original_read = File.__dict__["read"]
+
+
+class TestHooks(FuzzyTestCase):
+    def setUp(self):
+        self.temp = File("tests/temp/test-hooks")
+        self.temp.delete()
+
+    def tearDown(self):
+        self.temp.delete()
+
+    def test_start_end(self):
+        started = []
+        ended = []
+        with hooks.add(start=lambda s: started.append(s.operation), end=ended.append, syscalls=True):
+            file = self.temp / "a.txt"
+            file.write("hello")
+            self.assertEqual(file.read(), "hello")
+            URL("http://example.com")
+
+        self.assertEqual(started, ["write", "read", "url.parse"])
+        self.assertEqual([s.operation for s in ended], ["write", "read", "url.parse"])
+        write, read, parse = ended
+        self.assertEqual(write.path, file.os_path)
+        self.assertEqual(write.bytes, 5)
+        self.assertEqual(read.bytes, 5)
+        self.assertGreaterEqual(read.syscalls, 1)
+        self.assertGreater(read.duration, 0)
+        self.assertIsNone(read.error)
+        self.assertIsNone(parse.path)
+        self.assertIs(File.__dict__["read"], original_read)
+
+    def test_bytes_not_characters(self):
+        ended = []
+        with hooks.add(end=ended.append):
+            file = self.temp / "a.txt"
+            file.write("héllo")
+            file.append("é", encoding="latin1")
+            file.read_bytes()
+            file.read("latin1")
+
+        self.assertEqual([(s.operation, s.bytes) for s in ended], [("write", 6), ("append", 2), ("read_bytes", 8), ("read", 8)])
+
+    def test_operations_filter(self):
+        ended = []
+        with hooks.add(end=ended.append, operations=["read"]):
+            file = self.temp / "a.txt"
+            file.write("hello")
+            file.read()
+        self.assertEqual([s.operation for s in ended], ["read"])
+
+    def test_unknown_operation(self):
+        with self.assertRaises(Exception):
+            hooks.add(end=print, operations=["not-an-operation"])
+
+    def test_manager(self):
+        events = []
+
+        @contextmanager
+        def trace(span):
+            events.append(("enter", span.operation))
+            try:
+                yield
+            except Exception as cause:
+                events.append(("error", span.operation))
+                raise
+            events.append(("exit", span.operation))
+
+        with hooks.add(manager=trace):
+            with self.assertRaises(Exception):
+                (self.temp / "missing.txt").read()
+        self.assertEqual(events, [("enter", "read"), ("error", "read")])
+
+    def test_error(self):
+        ended = []
+        with hooks.add(end=ended.append):
+            with self.assertRaises(Exception):
+                (self.temp / "missing.txt").read_bytes()
+        self.assertIsNotNone(ended[0].error)
+
+    def test_traversal(self):
+        for name in ["a/b/c.txt", "a/d.txt", "e.txt"]:
+            (self.temp / name).write("x")
+        ended = []
+        with hooks.add(end=ended.append, operations=["descendants", "leaves", "find"], syscalls=True):
+            self.assertEqual(len(list(self.temp.descendants)), 6)
+            self.assertEqual(len(list(self.temp.leaves)), 3)
+            self.assertEqual(len(list(self.temp.find(r".*\.txt"))), 3)
+        # RECURSION IS ONE SPAN
+        self.assertEqual([(s.operation, s.items) for s in ended], [("descendants", 6), ("leaves", 3), ("find", 3)])
+        self.assertGreaterEqual(ended[0].syscalls, 3)
+
+    def test_spooled_stays_in_memory(self):
+        ended = []
+        with hooks.add(end=ended.append), SpooledTempFile() as temp:
+            temp.write('{"a": 1}')
+            self.assertEqual(temp.read_json(), {"a": 1})
+            self.assertEqual(temp.read_bytes(), b'{"a": 1}')
+            self.assertFalse(temp.spilled)
+        # SpooledTempFile OVERRIDES write AND read_bytes, read_json IS INHERITED
+        self.assertEqual([(s.operation, s.path) for s in ended], [("read_json", None)])
+
+    def test_lines(self):
+        file = self.temp / "lines.txt"
+        file.write("a\nbb\nccc")
+        ended = []
+        with hooks.add(end=ended.append):
+            self.assertEqual(list(file), ["a", "bb", "ccc"])
+        self.assertEqual([(s.operation, s.items, s.bytes) for s in ended], [("read_lines", 3, 9)])
+
+    def test_failing_hook(self):
+        def fail(span):
+            raise Exception("bad hook")
+
+        with hooks.add(start=fail, end=fail):
+            file = self.temp / "a.txt"
+            file.write("hello")
+            self.assertEqual(file.read(), "hello")
@@ -0,0 +1,84 @@
+# encoding: utf-8
+#
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at https://www.mozilla.org/en-US/MPL/2.0/.
+#
+# Author: Kyle Lahnakoski (kyle@lahnakoski.com)
+#
+import os
+import subprocess
+import sys
+
+from mo_testing.fuzzytestcase import FuzzyTestCase
+
+from mo_files import File, URL, instrument
+
+original_read = File.__dict__["read"]
+
+
+class TestInstrument(FuzzyTestCase):
+    def setUp(self):
+        instrument.reset()
+
+    def tearDown(self):
+        instrument.disable()
+
+    def test_counts(self):
+        instrument.enable(prefixes=["tests/temp"], syscalls=True)
+        file = File("tests/temp/test-instrument.txt")
+        file.write("hello")
+        file.append("world")
+        self.assertEqual(file.read(), "helloworld\n")
+        self.assertEqual(list(file), ["helloworld"])
+        File.copy(file, "tests/temp/test-instrument2.txt")
+        File("tests/temp/test-instrument2.txt").delete()
+        file.delete()
+        str(URL("http://example.com/a?b=c"))
+
+        result = instrument.snapshot()
+        ops = result["operations"]
+        self.assertEqual(ops["write"]["count"], 1)
+        self.assertEqual(ops["write"]["bytes"], 5)
+        self.assertEqual(ops["append"]["bytes"], 6)
+        self.assertEqual(ops["read"]["bytes"], 11)
+        self.assertGreaterEqual(ops["read"]["syscalls"], 1)
+        self.assertEqual(ops["read_lines"]["count"], 1)
+        self.assertEqual(ops["read_lines"]["bytes"], 11)
+        self.assertEqual(ops["copy"]["bytes"], 11)
+        self.assertEqual(ops["delete"]["count"], 2)
+        self.assertEqual(ops["url.parse"]["bytes"], 24)
+        self.assertEqual(ops["url.format"]["count"], 1)
+        self.assertEqual(sum(ops["read"]["histogram"].values()), 1)
+
+        by_prefix = result["by_prefix"][File("tests/temp").os_path]
+        self.assertEqual(by_prefix["write"]["count"], 1)
+        self.assertEqual(by_prefix["copy"]["count"], 1)
+
+    def test_errors(self):
+        instrument.enable()
+        with self.assertRaises(Exception):
+            File("tests/temp/does-not-exist.txt").read()
+        self.assertEqual(instrument.snapshot()["operations"]["read"]["errors"], 1)
+
+    def test_disabled_restores(self):
+        instrument.enable()
+        self.assertIsNot(File.__dict__["read"], original_read)
+        instrument.disable()
+        self.assertIs(File.__dict__["read"], original_read)
+        File("tests/resources/test-file.txt").read()
+        self.assertEqual(instrument.snapshot()["operations"], {})
+
+    def test_no_audit_hook_by_default(self):
+        # AUDIT HOOKS ARE PROCESS-WIDE AND PERMANENT, SO LOOK IN A FRESH INTERPRETER
+        code = "; ".join([
+            "from mo_files import File, hooks, instrument",
+            "instrument.enable()",
+            "File('tests/resources/test-file.txt').read()",
+            "instrument.disable()",
+            "print(hooks._audit_installed, instrument.snapshot()['operations']['read']['syscalls'])",
+        ])
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [os.getcwd(), os.environ.get("PYTHONPATH")])))
+        result = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True, check=True)
+        self.assertEqual(result.stdout.split(), ["False", "0"])
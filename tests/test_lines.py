@@ -0,0 +1,267 @@
+# encoding: utf-8
+#
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at https://www.mozilla.org/en-US/MPL/2.0/.
+#
+# Author: Kyle Lahnakoski (kyle@lahnakoski.com)
+#
+import os
+from threading import Event
+
+from mo_testing.fuzzytestcase import FuzzyTestCase
+
+from mo_files import File, lines
+
+temp = File("tests/temp")
+
+
+class TestLines(FuzzyTestCase):
+    def setUp(self):
+        temp.create()
+
+    def test_tail(self):
+        file = temp / "test-tail.txt"
+        file.write("".join(f"line {i}\n" for i in range(1000)))
+        try:
+            self.assertEqual(file.tail(3), ["line 997", "line 998", "line 999"])
+            self.assertEqual(lines.tail(file.os_path, 3, block_size=5), ["line 997", "line 998", "line 999"])
+            self.assertEqual(lines.tail(file.os_path, 2000, block_size=7), list(file.read_lines()))
+            self.assertEqual(file.tail(0), [])
+        finally:
+            file.delete()
+
+    def test_tail_matches_read_lines(self):
+        for name in ["test-file0.txt", "test-file1.txt", "test-file2.txt"]:
+            file = File("tests/resources") / name
+            self.assertEqual(file.tail(5), list(file.read_lines()))
+
+    def test_tail_empty(self):
+        file = temp / "test-tail-empty.txt"
+        file.write("")
+        try:
+            self.assertEqual(file.tail(5), [])
+        finally:
+            file.delete()
+
+    def test_follow(self):
+        file = temp / "test-follow.txt"
+        file.write("old\n")
+        please_stop = Event()
+        try:
+            follower = file.follow(please_stop=please_stop, interval=0.01)
+            file.append("new 1")
+            file.extend(["new 2", "new 3"])
+            self.assertEqual([next(follower) for _ in range(3)], ["new 1", "new 2", "new 3"])
+
+            # TRUNCATE
+            file.write("")
+            file.append("after truncate")
+            self.assertEqual(next(follower), "after truncate")
+
+            # ROTATE
+            rotated = temp / "test-follow.1.txt"
+            os.rename(file.os_path, rotated.os_path)
+            rotated.append("last of old")
+            file.append("first of new")
+            self.assertEqual([next(follower), next(follower)], ["last of old", "first of new"])
+
+            please_stop.set()
+            self.assertEqual(list(follower), [])
+        finally:
+            file.delete()
+            (temp / "test-follow.1.txt").delete()
+
+    def test_line_index(self):
+        file = temp / "test-index.txt"
+        expected = [f"line {i}" for i in range(1000)] + ["", "last"]
+        file.write("\n".join(expected))
+        try:
+            self.assertEqual(len(file.lines), len(expected))
+            self.assertEqual(file.line(0), "line 0")
+            self.assertEqual(file.line(500), "line 500")
+            self.assertEqual(file.line(-1), "last")
+            self.assertEqual(file.lines[998:1002], expected[998:1002])
+            self.assertEqual(file.lines[::100], expected[::100])
+            self.assertEqual(file.lines[:], list(file.read_lines()))
+            with self.assertRaises(IndexError):
+                file.line(len(expected))
+            self.assertTrue(File(file.rel_path + ".idx").exists)
+        finally:
+            file.delete()
+            File(file.rel_path + ".idx").delete()
+
+    def test_line_index_persisted(self):
+        file = temp / "test-index2.txt"
+        file.write("a\nb\n\n")
+        sidecar = file.os_path + ".idx"
+        try:
+            first = lines.LineIndex(file.os_path, sidecar)
+            self.assertEqual(first[:], ["a", "b", ""])
+            second = lines.LineIndex(file.os_path, sidecar)
+            self.assertEqual(list(second.offsets), [0, 2, 4, 5])
+
+            file.append("c")
+            self.assertFalse(second.is_valid())
+            self.assertEqual(file.lines[:], ["a", "b", "", "c"])
+        finally:
+            file.delete()
+            File(sidecar).delete()
+
+    def test_line_index_leaves_foreign_sidecar(self):
+        file = temp / "test-index3.txt"
+        sidecar = File(file.rel_path + ".idx")
+        file.write("a\nb\n")
+        sidecar.write("not an index")
+        try:
+            self.assertEqual(file.lines[:], ["a", "b"])
+            self.assertEqual(sidecar.read(), "not an index")
+            file.delete()
+            self.assertEqual(sidecar.read(), "not an index")
+        finally:
+            file.delete()
+            sidecar.delete()
+
+    def test_delete_removes_sidecar(self):
+        file = temp / "test-index4.txt"
+        sidecar = File(file.rel_path + ".idx")
+        file.write("a\nb\n")
+        try:
+            self.assertEqual(len(file.lines), 2)
+            self.assertTrue(sidecar.exists)
+            file.delete()
+            self.assertFalse(sidecar.exists)
+            self.assertEqual([c.name for c in temp.children if c.name.startswith("test-index4")], [])
+        finally:
+            file.delete()
+            sidecar.delete()
+
+    def test_line_index_matches_read_lines(self):
+        for name in ["test-file0.txt", "test-file1.txt", "test-file2.txt"]:
+            file = File("tests/resources") / name
+            index = lines.LineIndex(file.os_path)
+            self.assertEqual(index[:], list(file.read_lines()))
+            self.assertEqual(len(index), len(list(file.read_lines())))
+
+    def test_bisect(self):
+        file = temp / "test-bisect.tsv"
+        rows = sorted([(i // 3, f"value {i}") for i in range(3000)] + [(5000, "last")])
+        file.write("".join(f"{k}\t{v}\n" for k, v in rows))
+        first = lambda line: int(line.split("\t")[0])
+        try:
+            self.assertEqual(list(file.bisect(0, first)), ["0\tvalue 0", "0\tvalue 1", "0\tvalue 2"])
+            self.assertEqual(list(file.bisect(500, first)), ["500\tvalue 1500", "500\tvalue 1501", "500\tvalue 1502"])
+            self.assertEqual(list(file.bisect(999, first)), ["999\tvalue 2997", "999\tvalue 2998", "999\tvalue 2999"])
+            self.assertEqual(list(file.bisect(5000, first)), ["5000\tlast"])
+            self.assertEqual(list(file.bisect(-1, first)), [])
+            self.assertEqual(list(file.bisect(1000, first)), [])
+            self.assertEqual(list(file.bisect(6000, first)), [])
+            for k in range(0, 1000, 37):
+                self.assertEqual(list(file.bisect(k, first)), [line for line in file if first(line) == k])
+        finally:
+            file.delete()
+
+    def test_bisect_whole_line(self):
+        file = temp / "test-bisect.txt"
+        file.write("apple\nbanana\nbanana\ncherry")
+        try:
+            self.assertEqual(list(file.bisect("banana")), ["banana", "banana"])
+            self.assertEqual(list(file.bisect("cherry")), ["cherry"])
+            self.assertEqual(list(file.bisect("apple")), ["apple"])
+            self.assertEqual(list(file.bisect("blueberry")), [])
+        finally:
+            file.delete()
+
+    def test_sort_lines(self):
+        file = temp / "test-sort.txt"
+        values = [f"{(i * 7919) % 1000:04d}" for i in range(3000)]
+        file.write("".join(v + "\n" for v in values))
+        try:
+            output = file.sort_lines(output=temp / "test-sorted.txt", run_size=1000)
+            self.assertEqual(list(output), sorted(values))
+            self.assertEqual(list(file), values)
+
+            file.sort_lines(unique=True, run_size=500, key=reverse)
+            self.assertEqual(list(file), sorted(set(values), key=reverse))
+        finally:
+            file.delete()
+            (temp / "test-sorted.txt").delete()
+
+    def test_sort_lines_parallel(self):
+        file = temp / "test-sort-parallel.txt"
+        values = [str((i * 7919) % 10007) for i in range(5000)]
+        file.write("\n".join(values))
+        try:
+            file.sort_lines(key=int, run_size=2000, processes=2)
+            self.assertEqual(list(file), sorted(values, key=int))
+        finally:
+            file.delete()
+
+    def test_sort_lines_keeps_trailing_whitespace(self):
+        file = temp / "test-sort-tsv.txt"
+        file.write_bytes(b"b\t2\t\na\t1\t\r\nc \n")
+        try:
+            file.sort_lines(run_size=4)
+            self.assertEqual(file.read_bytes(), b"a\t1\t\nb\t2\t\nc \n")
+        finally:
+            file.delete()
+
+    def test_sort_lines_unique_key_ties(self):
+        file = temp / "test-sort-ties.txt"
+        file.write("1\tx\n1\ty\n1\tx\n0\tz\n")
+        try:
+            file.sort_lines(unique=True, key=first)
+            self.assertEqual(list(file), ["0\tz", "1\tx", "1\ty"])
+
+            # DUPLICATES IN DIFFERENT RUNS
+            values = [f"{i % 3}\t{'abc'[i % 5 % 3]}" for i in range(300)]
+            file.write("".join(v + "\n" for v in values))
+            file.sort_lines(unique=True, key=first, run_size=100)
+            self.assertEqual(list(file), sorted(dict.fromkeys(values), key=first))
+        finally:
+            file.delete()
+
+
+    def test_partitions(self):
+        file = temp / "test-partitions.txt"
+        content = "".join(f"{'x' * (i % 17)}\n" for i in range(1000))
+        file.write(content)
+        try:
+            for n in [1, 2, 7, 100, 5000]:
+                ranges = file.partitions(n)
+                self.assertLessEqual(len(ranges), n)
+                self.assertEqual(ranges[0][0], 0)
+                self.assertEqual(ranges[-1][1], len(content))
+                for (_, end), (start, _) in zip(ranges, ranges[1:]):
+                    self.assertEqual(end, start)
+                    self.assertEqual(content[start - 1], "\n")
+        finally:
+            file.delete()
+
+    def test_map_reduce_lines(self):
+        file = temp / "test-map.tsv"
+        file.write("".join(f"{i}\tvalue\n" for i in range(10000)))
+        try:
+            self.assertEqual(list(lines.map_lines(file.os_path, first, workers=1, partition_size=1000)), list(range(10000)))
+            self.assertEqual(list(file.map_lines(first, workers=2)), list(range(10000)))
+            self.assertEqual(file.reduce_lines(add_first, add, 0, workers=2), sum(range(10000)))
+            self.assertEqual(lines.reduce_lines(file.os_path, add_first, add, 0, workers=1, partition_size=999), sum(range(10000)))
+        finally:
+            file.delete()
+
+
+def first(line):
+    return int(line.split("\t")[0])
+
+
+def add_first(total, line):
+    return total + first(line)
+
+
+def add(a, b):
+    return a + b
+
+
+def reverse(line):
+    return line[::-1]
@@ -0,0 +1,117 @@
+# encoding: utf-8
+#
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at https://www.mozilla.org/en-US/MPL/2.0/.
+#
+# Author: Kyle Lahnakoski (kyle@lahnakoski.com)
+#
+import subprocess
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from threading import Thread
+from unittest import skipIf
+
+from mo_testing.fuzzytestcase import FuzzyTestCase
+
+from mo_files import File, is_windows
+
+TRY_LOCK = """
+import sys
+from mo_files import File
+try:
+    with File(sys.argv[1]).lock(exclusive=sys.argv[2] == "x", timeout=0.1, offset=int(sys.argv[3]), length=int(sys.argv[4])):
+        print("locked")
+except Exception:
+    print("timeout")
+"""
+
+
+def try_lock(path, exclusive=True, offset=0, length=0):
+    """
+    TRY THE LOCK FROM ANOTHER PROCESS
+    """
+    result = subprocess.run(
+        [sys.executable, "-c", TRY_LOCK, path, "x" if exclusive else "s", str(offset), str(length)],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return result.stdout.strip()
+
+
+@skipIf(is_windows, "fcntl locks are not available on Windows")
+class TestLocks(FuzzyTestCase):
+    def setUp(self):
+        self.file = File("tests/temp/test-locks/shared.txt")
+        self.file.write("hello\n")
+
+    def tearDown(self):
+        File("tests/temp/test-locks").delete()
+
+    def test_exclusive_between_processes(self):
+        with self.file.lock():
+            self.assertEqual(try_lock(self.file.os_path), "timeout")
+            self.assertEqual(try_lock(self.file.os_path, exclusive=False), "timeout")
+        self.assertEqual(try_lock(self.file.os_path), "locked")
+
+    def test_shared(self):
+        with self.file.lock(exclusive=False):
+            self.assertEqual(try_lock(self.file.os_path, exclusive=False), "locked")
+            self.assertEqual(try_lock(self.file.os_path), "timeout")
+            with self.file.lock(exclusive=False, timeout=0.1):
+                pass
+
+    def test_byte_ranges(self):
+        with self.file.lock(offset=0, length=10):
+            self.assertEqual(try_lock(self.file.os_path, offset=10, length=10), "locked")
+            self.assertEqual(try_lock(self.file.os_path, offset=5, length=10), "timeout")
+
+    def test_threads(self):
+        results = []
+
+        def other():
+            try:
+                with self.file.lock(timeout=0.1):
+                    results.append("locked")
+            except Exception:
+                results.append("timeout")
+
+        with self.file.lock():
+            thread = Thread(target=other)
+            thread.start()
+            thread.join()
+        self.assertEqual(results, ["timeout"])
+
+    def test_timeout(self):
+        with self.file.lock():
+            with self.assertRaises(Exception):
+                self.file.write("changed", lock=True, timeout=0.1)
+            with self.assertRaises(Exception):
+                self.file.append("more", lock=True, timeout=0.1)
+        self.assertEqual(self.file.read(), "hello\n")
+
+    def test_append_does_not_block_readers(self):
+        with self.file.lock(exclusive=False, offset=0, length=self.file.length):
+            self.file.append("world", lock=True, timeout=1)
+        self.assertEqual(self.file.read(), "hello\nworld\n")
+
+    def test_concurrent_appends(self):
+        path = self.file.os_path
+        self.file.delete()
+        with ProcessPoolExecutor(4, mp_context=get_context("spawn")) as pool:
+            list(pool.map(append_lines, [path] * 4, range(4)))
+        lines = list(File(path))
+        self.assertEqual(len(lines), 4 * 200)
+        for line in lines:
+            worker, _, rest = line.partition(":")
+            self.assertEqual(rest, worker * 500)
+
+
+def append_lines(path, worker):
+    file = File(path)
+    for i in range(100):
+        file.append(f"{worker}:" + str(worker) * 500, lock=True)
+        file.extend([f"{worker}:" + str(worker) * 500], lock=True)
@@ -0,0 +1,48 @@
+# encoding: utf-8
+#
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at https://www.mozilla.org/en-US/MPL/2.0/.
+#
+# Author: Kyle Lahnakoski (kyle@lahnakoski.com)
+#
+from mo_testing.fuzzytestcase import FuzzyTestCase
+
+from mo_files import File
+from mo_files.ranges import coalesce
+
+
+class TestRanges(FuzzyTestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.content = bytes(range(256)) * 1024
+        cls.file = File("tests/temp/test-ranges.bin")
+        cls.file.write_bytes(cls.content)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.file.delete()
+
+    def test_read_range(self):
+        self.assertEqual(self.file.read_range(1000, 10), self.content[1000:1010])
+        self.assertEqual(self.file.read_range(0, 0), b"")
+        # PAST END OF FILE
+        self.assertEqual(self.file.read_range(len(self.content) - 5, 100), self.content[-5:])
+        self.assertEqual(self.file.read_range(len(self.content) + 5, 100), b"")
+
+    def test_read_ranges(self):
+        ranges = [(50000, 100), (10, 5), (0, 20), (200000, 3), (12, 1000)]
+        expected = [self.content[o : o + n] for o, n in ranges]
+        self.assertEqual(self.file.read_ranges(ranges), expected)
+        self.assertEqual(self.file.read_ranges(ranges, max_gap=0), expected)
+        self.assertEqual(self.file.read_ranges(ranges, concurrent=True), expected)
+
+    def test_coalesce(self):
+        ranges = [(5000, 10), (0, 10), (20, 10), (100, 10), (25, 2)]
+        self.assertEqual(coalesce(ranges, max_gap=10), [(0, 30, [1, 2, 4]), (100, 110, [3]), (5000, 5010, [0])])
+        self.assertEqual(coalesce(ranges, max_gap=100), [(0, 110, [1, 2, 4, 3]), (5000, 5010, [0])])
+
+    def test_negative(self):
+        with self.assertRaises(Exception):
+            self.file.read_ranges([(-1, 10)])
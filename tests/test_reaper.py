@@ -0,0 +1,137 @@
+# encoding: utf-8
+#
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at https://www.mozilla.org/en-US/MPL/2.0/.
+#
+# Author: Kyle Lahnakoski (kyle@lahnakoski.com)
+#
+import os
+import time
+
+from mo_testing.fuzzytestcase import FuzzyTestCase
+
+from mo_files import File, TempFile, TempDirectory
+from mo_files.reaper import Reaper, reaper, remove_tree, Progress, TRASH
+
+
+class TestReaper(FuzzyTestCase):
+    def test_temp_file_deleted(self):
+        with TempFile() as temp:
+            temp.write("hello")
+            self.assertTrue(temp.exists)
+        wait_for(lambda: not temp.exists)
+
+    def test_temp_directory_deleted(self):
+        with TempDirectory() as temp:
+            (temp / "a" / "b.txt").write("hello")
+        reaper.flush()
+        self.assertFalse(temp.exists)
+        self.assertEqual(reaper.pending, 0)
+
+    def test_missing_is_not_failure(self):
+        before = reaper.failed
+        reaper.delete(File("tests/temp/does-not-exist").os_path)
+        wait_for(lambda: reaper.pending == 0)
+        self.assertEqual(reaper.failed, before)
+
+    def test_retry_then_fail(self):
+        attempts = []
+
+        def stubborn(path):
+            attempts.append(path)
+            raise Exception("still in use")
+
+        local = Reaper(remove=stubborn, retry_delay=0.01, max_attempts=3)
+        local.delete("somewhere")
+        wait_for(lambda: local.failed == 1)
+        self.assertEqual(len(attempts), 3)
+        self.assertEqual(local.pending, 0)
+
+    def test_retry_then_succeed(self):
+        attempts = []
+
+        def eventually(path):
+            attempts.append(path)
+            if len(attempts) < 3:
+                raise Exception("still in use")
+
+        local = Reaper(remove=eventually, retry_delay=0.01)
+        local.delete("somewhere")
+        wait_for(lambda: local.deleted == 1)
+        self.assertEqual(local.failed, 0)
+        self.assertEqual(len(attempts), 3)
+
+    def test_background_delete(self):
+        root = File("tests/temp/test-background")
+        for i in range(20):
+            for j in range(30):
+                (root / f"dir{i}" / f"file{j}.txt").write("hello")
+        before = reaper.progress.files
+        root.delete(background=True)
+        self.assertFalse(root.exists)
+        reaper.flush()
+        wait_for(lambda: reaper.pending == 0)
+        self.assertEqual(reaper.progress.files - before, 600)
+        self.assertEqual([c.name for c in File("tests/temp").children if "test-background" in c.name], [])
+        self.assertFalse(File("tests/temp/" + TRASH).exists)
+
+    def test_background_delete_is_not_listed(self):
+        parent = File("tests/temp/test-background-parent")
+        for i in range(50):
+            (parent / "gone" / f"dir{i}" / "file.txt").write("hello")
+        (parent / "kept.txt").write("hello")
+        try:
+            (parent / "gone").delete(background=True)
+            self.assertEqual([c.name for c in parent.children], ["kept.txt"])
+            self.assertEqual([c.name for c in parent.leaves], ["kept.txt"])
+            self.assertEqual([c.name for c in parent.descendants], ["test-background-parent", "kept.txt"])
+            self.assertEqual([c.name for c in parent.find(r".*\.txt")], ["kept.txt"])
+            reaper.flush()
+            wait_for(lambda: reaper.pending == 0)
+            self.assertEqual(os.listdir(parent.os_path), ["kept.txt"])
+        finally:
+            parent.delete()
+
+    def test_remove_tree(self):
+        root = File("tests/temp/test-remove-tree")
+        (root / "a" / "b" / "c.txt").write("hello")
+        (root / "d.txt").write("hello")
+        progress = Progress()
+        remove_tree(root.os_path, workers=2, progress=progress)
+        self.assertFalse(root.exists)
+        self.assertEqual(progress.files, 2)
+        self.assertEqual(progress.directories, 3)
+        self.assertEqual(progress.errors, [])
+
+    def test_pool_is_shared(self):
+        local = Reaper()
+        small = File("tests/temp/test-pool-small")
+        for i in range(300):
+            (small / f"d{i % 3}" / f"f{i}.txt").write("x")
+        local.delete(small.os_path)
+        wait_for(lambda: local.pending == 0)
+        self.assertFalse(small.exists)
+        self.assertIsNone(local.pool)
+
+        pools = []
+        for _ in range(3):
+            big = File("tests/temp/test-pool-big")
+            for i in range(2000):
+                (big / f"d{i % 7}" / f"f{i}.txt").write("x")
+            local.delete(big.os_path)
+            wait_for(lambda: local.pending == 0)
+            self.assertFalse(big.exists)
+            pools.append(local.pool)
+        self.assertEqual(local.progress.files, 300 + 3 * 2000)
+        self.assertIsNotNone(pools[0])
+        self.assertTrue(all(p is pools[0] for p in pools))
+
+
+def wait_for(condition, timeout=10):
+    end = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > end:
+            raise Exception("timeout")
+        time.sleep(0.01)
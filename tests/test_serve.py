@@ -0,0 +1,177 @@
+# encoding: utf-8
+#
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at https://www.mozilla.org/en-US/MPL/2.0/.
+#
+# Author: Kyle Lahnakoski (kyle@lahnakoski.com)
+#
+import gzip
+import os
+import socket
+from http.client import HTTPConnection
+from threading import Thread
+
+from mo_testing.fuzzytestcase import FuzzyTestCase
+
+from mo_files import File, serve
+
+
+class Server:
+    """
+    ONE-REQUEST-PER-CONNECTION HTTP SERVER FOR THE FILES IN root
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.sock = socket.create_server(("127.0.0.1", 0))
+        self.port = self.sock.getsockname()[1]
+        self.thread = Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                conn, _ = self.sock.accept()
+            except OSError:
+                return
+            with conn:
+                request = b""
+                while b"\r\n\r\n" not in request:
+                    request += conn.recv(4096)
+                lines = request.decode("latin1").split("\r\n")
+                method, path, _ = lines[0].split(" ")
+                headers = dict(line.split(": ", 1) for line in lines[1:] if line)
+                response = serve.prepare(self.root / path.lstrip("/"), headers)
+                response.headers.append(("Connection", "close"))
+                response.send(conn, body=method != "HEAD")
+
+    def request(self, path, headers=None, method="GET"):
+        conn = HTTPConnection("127.0.0.1", self.port)
+        try:
+            conn.request(method, path, headers=headers or {})
+            response = conn.getresponse()
+            return response.status, dict(response.getheaders()), response.read()
+        finally:
+            conn.close()
+
+    def close(self):
+        self.sock.close()
+
+
+class TestServe(FuzzyTestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.root = File("tests/temp/test-serve")
+        cls.root.delete()
+        cls.content = bytes(range(256)) * 4096  # 1MB
+        (cls.root / "data.bin").write_bytes(cls.content)
+        (cls.root / "app.js").write("var x = 1;\n" * 1000)
+        cls.server = Server(cls.root)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.close()
+        cls.root.delete()
+
+    def test_whole_file(self):
+        status, headers, body = self.server.request("/data.bin")
+        self.assertEqual(status, 200)
+        self.assertEqual(body, self.content)
+        self.assertEqual(headers["Content-Length"], str(len(self.content)))
+        self.assertEqual(headers["Accept-Ranges"], "bytes")
+        self.assertTrue(headers["ETag"].startswith('"'))
+        self.assertIn("GMT", headers["Last-Modified"])
+
+    def test_head(self):
+        status, headers, body = self.server.request("/data.bin", method="HEAD")
+        self.assertEqual(status, 200)
+        self.assertEqual(body, b"")
+        self.assertEqual(headers["Content-Length"], str(len(self.content)))
+
+    def test_missing(self):
+        status, _, _ = self.server.request("/missing.bin")
+        self.assertEqual(status, 404)
+
+    def test_ranges(self):
+        status, headers, body = self.server.request("/data.bin", {"Range": "bytes=1000-1999"})
+        self.assertEqual(status, 206)
+        self.assertEqual(body, self.content[1000:2000])
+        self.assertEqual(headers["Content-Range"], f"bytes 1000-1999/{len(self.content)}")
+
+        status, _, body = self.server.request("/data.bin", {"Range": "bytes=-10"})
+        self.assertEqual(status, 206)
+        self.assertEqual(body, self.content[-10:])
+
+        status, _, body = self.server.request("/data.bin", {"Range": "bytes=1048570-"})
+        self.assertEqual(body, self.content[1048570:])
+
+        status, headers, _ = self.server.request("/data.bin", {"Range": f"bytes={len(self.content)}-"})
+        self.assertEqual(status, 416)
+        self.assertEqual(headers["Content-Range"], f"bytes */{len(self.content)}")
+
+        # MULTIPLE RANGES ARE IGNORED
+        status, _, body = self.server.request("/data.bin", {"Range": "bytes=0-1,5-6"})
+        self.assertEqual(status, 200)
+
+    def test_if_range(self):
+        _, headers, _ = self.server.request("/data.bin", method="HEAD")
+        status, _, _ = self.server.request("/data.bin", {"Range": "bytes=0-9", "If-Range": headers["ETag"]})
+        self.assertEqual(status, 206)
+        status, _, _ = self.server.request("/data.bin", {"Range": "bytes=0-9", "If-Range": '"old"'})
+        self.assertEqual(status, 200)
+
+    def test_not_modified(self):
+        _, headers, _ = self.server.request("/data.bin", method="HEAD")
+        status, _, body = self.server.request("/data.bin", {"If-None-Match": headers["ETag"]})
+        self.assertEqual(status, 304)
+        self.assertEqual(body, b"")
+        status, _, _ = self.server.request("/data.bin", {"If-Modified-Since": headers["Last-Modified"]})
+        self.assertEqual(status, 304)
+        status, _, _ = self.server.request("/data.bin", {"If-None-Match": '"other"'})
+        self.assertEqual(status, 200)
+
+    def test_gzip_sibling(self):
+        original = self.root / "app.js"
+        compressed = gzip.compress(original.read_bytes())
+        sibling = self.root / "app.js.gz"
+        sibling.write_bytes(compressed)
+        try:
+            status, headers, body = self.server.request("/app.js", {"Accept-Encoding": "gzip, deflate"})
+            self.assertEqual(status, 200)
+            self.assertEqual(headers["Content-Encoding"], "gzip")
+            self.assertEqual(headers["Content-Type"], "application/javascript")
+            self.assertEqual(body, compressed)
+
+            status, headers, body = self.server.request("/app.js", {"Accept-Encoding": "gzip;q=0"})
+            self.assertNotIn("Content-Encoding", headers)
+            self.assertEqual(body, original.read_bytes())
+
+            # STALE SIBLING IS IGNORED
+            stat = os.stat(original.os_path)
+            os.utime(sibling.os_path, ns=(stat.st_atime_ns, stat.st_mtime_ns - 10 ** 9))
+            status, headers, body = self.server.request("/app.js", {"Accept-Encoding": "gzip"})
+            self.assertNotIn("Content-Encoding", headers)
+        finally:
+            sibling.delete()
+
+    def test_accept_encoding(self):
+        self.assertTrue(serve._accepts_gzip("gzip;q=abc"))
+        self.assertTrue(serve._accepts_gzip("gzip;q=0.5;x=1"))
+        self.assertTrue(serve._accepts_gzip("*;q=0, gzip"))
+        self.assertFalse(serve._accepts_gzip("gzip;q=0, *"))
+        self.assertTrue(serve._accepts_gzip("br, *;q=0.1"))
+        self.assertFalse(serve._accepts_gzip("deflate, br"))
+
+        response = serve.prepare(self.root / "app.js", {"Accept-Encoding": "gzip;q=abc"})
+        self.assertEqual(response.status, 200)
+
+    def test_directory(self):
+        self.assertEqual(serve.prepare(self.root, {}).status, 404)
+
+    def test_chunks(self):
+        response = serve.prepare(self.root / "data.bin", {"Range": "bytes=10-100009"})
+        chunks = list(response.chunks(block_size=4096))
+        self.assertEqual(b"".join(chunks), self.content[10:100010])
+        self.assertEqual(max(len(c) for c in chunks), 4096)
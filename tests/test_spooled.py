@@ -0,0 +1,66 @@
+# encoding: utf-8
+#
+#
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this file,
+# You can obtain one at https://www.mozilla.org/en-US/MPL/2.0/.
+#
+# Author: Kyle Lahnakoski (kyle@lahnakoski.com)
+#
+from mo_testing.fuzzytestcase import FuzzyTestCase
+
+from mo_files import File, SpooledTempFile
+from mo_files.reaper import reaper
+
+
+class TestSpooled(FuzzyTestCase):
+    def test_in_memory(self):
+        with SpooledTempFile() as temp:
+            temp.write("hello")
+            temp.append("world")
+            temp.extend(["a", "b"])
+            self.assertFalse(temp.spilled)
+            self.assertTrue(temp.exists)
+            self.assertEqual(temp.read(), "helloworld\na\nb\n")
+            self.assertEqual(list(temp.read_lines()), ["helloworld", "a", "b"])
+            self.assertEqual(list(temp), ["helloworld", "a", "b"])
+            self.assertEqual(temp.length, 15)
+            temp.write_bytes(b'{"a": 1}')
+            self.assertEqual(temp.read_json(), {"a": 1})
+            self.assertFalse(temp.spilled)
+            temp.delete()
+            self.assertFalse(temp.exists)
+
+    def test_spills(self):
+        with SpooledTempFile(max_size=10) as temp:
+            temp.write("12345")
+            self.assertFalse(temp.spilled)
+            temp.write(["12345", "67890", "abc"])
+            self.assertTrue(temp.spilled)
+            self.assertTrue(File(temp.os_path).exists)
+            self.assertEqual(File(temp.os_path).read(), "1234567890abc")
+            temp.extend(["x", "y"])
+            self.assertEqual(list(temp), ["1234567890abcx", "y"])
+            path = temp.os_path
+        reaper.flush()
+        self.assertFalse(File(path).exists)
+
+    def test_path_spills(self):
+        with SpooledTempFile() as temp:
+            temp.extend(["a", "b"])
+            path = temp.os_path
+            self.assertTrue(temp.spilled)
+            self.assertEqual(list(File(path).read_lines()), ["a", "b"])
+        reaper.flush()
+        self.assertFalse(File(path).exists)
+
+    def test_file_of_spooled(self):
+        with SpooledTempFile() as temp:
+            temp.write("hello")
+            self.assertIs(File(temp), temp)
+            self.assertEqual(temp.read(), "hello")
+            File.copy(temp, "tests/temp/test-spooled-copy.txt")
+        try:
+            self.assertEqual(File("tests/temp/test-spooled-copy.txt").read(), "hello")
+        finally:
+            File("tests/temp/test-spooled-copy.txt").delete()
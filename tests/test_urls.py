@@ -209,4 +209,108 @@ class TestURLs(FuzzyTestCase):
 
     def test_set_fragment(self):
         url = URL("file:///tests/resources")
-        self.assertEqual(str(url.set_fragment({"section1": 2})), "file:///tests/resources#section1=2")
\ No newline at end of file
+        self.assertEqual(str(url.set_fragment({"section1": 2})), "file:///tests/resources#section1=2")
+
+    def test_parse_many(self):
+        urls = [
+            "https://example.com/path?x=1",
+            "file:///tests/resources?a=b",
+            "https://example.com/path?x=1",
+            "http://example.net:8080/tests/resources#a",
+        ]
+        result = list(URL.parse_many(urls))
+        self.assertEqual([str(u) for u in result], urls)
+        self.assertIsNot(result[0], result[2])
+        self.assertIsNot(result[0].query, result[2].query)
+
+    def test_format_many(self):
+        urls = ["https://example.com/path?x=1", "file:///tests/resources?a=b"]
+        self.assertEqual(list(URL.format_many(URL(u) for u in urls)), urls)
+
+    def test_parse_many_processes(self):
+        urls = [f"https://example.com/path/{i}?x={i}" for i in range(100)]
+        result = list(URL.format_many(URL.parse_many(urls, processes=2, chunk_size=7), processes=2, chunk_size=11))
+        self.assertEqual(result, urls)
+
+    def test_pickle(self):
+        import pickle
+
+        url = URL("http://example.net:8080/tests/resources?a=b&c=1#d")
+        self.assertEqual(str(pickle.loads(pickle.dumps(url))), str(url))
+
+    def test_copy_shares_query(self):
+        a = URL("https://example.com/path?x=1")
+        b = a.set_host("example.net")
+        self.assertIs(a._query, b._query)
+        self.assertEqual(str(b), "https://example.net/path?x=1")
+        self.assertIs(a._query, b._query)
+
+    def test_copy_on_write(self):
+        a = URL("https://example.com/path?x=1")
+        b = a.set_port(8080)
+        b.query.y = 2
+        self.assertEqual(a.query, {"x": 1})
+        self.assertEqual(b.query, {"x": 1, "y": 2})
+
+        c = a / "other"
+        a.query.z = 3
+        self.assertEqual(c.query, {"x": 1})
+        self.assertEqual(str(c), "https://example.com/path/other?x=1")
+
+        # A query ALREADY HANDED OUT IS NOT SHARED WITH LATER COPIES
+        a = URL("http://x.com/p?x=1")
+        q = a.query
+        b = a.set_host("y.com")
+        q.z = 1
+        self.assertEqual(str(b), "http://y.com/p?x=1")
+        self.assertEqual(str(a), "http://x.com/p?x=1&z=1")
+
+    def test_slots(self):
+        url = URL("https://example.com/path?x=1")
+        with self.assertRaises(AttributeError):
+            url.other = 42
+
+    def test_parse_file_urls(self):
+        cases = [
+            ("file:///tests/resources", "file", "/tests/resources", {}, None),
+            ("file://", "file", "", {}, None),
+            ("file:///a/b?c=d", "file", "/a/b", {"c": "d"}, None),
+            ("file:///a/b#f", "file", "/a/b", {}, "f"),
+            ("file:///a/b?c=d#f", "file", "/a/b", {"c": "d"}, "f"),
+            ("file:///a#b?c=d", "file", "/a#b", {"c": "d"}, None),
+            ("file:///a?b#c?d", "file", "/a", {"b": True}, "c?d"),
+            ("//host/path?x=1#y", "", "host/path", {"x": 1}, "y"),
+            ("file://C:/Users/a b/c.json?metadata=a,b", "file", "C:/Users/a b/c.json", {"metadata": ["a", "b"]}, None),
+            ("file:///a/b/?", "file", "/a/b/", {}, None),
+            ("file:///a#", "file", "/a", {}, ""),
+            ("//", "", "", {}, None),
+        ]
+        for value, scheme, path, query, fragment in cases:
+            url = URL(value)
+            self.assertEqual(url.scheme, scheme)
+            self.assertEqual(url.path, path)
+            self.assertEqual(url.query, query)
+            self.assertEqual(url.fragment, fragment)
+
+    def test_long_file_url(self):
+        path = "/" + "/".join(f"directory{i}" for i in range(10_000)) + "/file.json"
+        url = URL("file://" + path + "?a=b")
+        self.assertEqual(url.path, path)
+        self.assertEqual(url.query, {"a": "b"})
+
+    def test_from_paths_many(self):
+        value = {}
+        for i in range(1000):
+            value[f"columns[{i}][name]"] = f"name{i}"
+            value[f"columns[{i}][search][regex]"] = False
+        struct = from_paths(value)
+        self.assertEqual(len(struct.columns), 1000)
+        self.assertEqual(struct.columns[999], {"name": "name999", "search": {"regex": False}})
+
+    def test_from_paths_errors(self):
+        with self.assertRaises(Exception):
+            from_paths({"columns[1": 1})
+        with self.assertRaises(Exception):
+            from_paths({"columns[1]": 1, "columns[name]": 2})
+        with self.assertRaises(Exception):
+            from_paths({"columns[name]": 1, "columns[1]": 2})